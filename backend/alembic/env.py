@@ -30,6 +30,7 @@ from plans.models import Plan
 from payments.models import PaymentRecord
 from attendance.models import Attendance
 from users.models import User
+from shared.models import ScheduledJob
 from dotenv import load_dotenv
 load_dotenv()
 
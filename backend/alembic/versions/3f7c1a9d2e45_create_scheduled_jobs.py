@@ -0,0 +1,34 @@
+"""create_scheduled_jobs
+
+Revision ID: 3f7c1a9d2e45
+Revises: ea1021c56f0f
+Create Date: 2026-10-17 11:02:14.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7c1a9d2e45'
+down_revision: Union[str, Sequence[str], None] = 'ea1021c56f0f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('scheduled_jobs',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_run_at', postgresql.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('last_duration_ms', sa.Integer(), nullable=True),
+    sa.Column('last_rows_affected', sa.Integer(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('run_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scheduled_jobs')
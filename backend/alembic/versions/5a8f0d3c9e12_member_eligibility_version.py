@@ -0,0 +1,86 @@
+"""member_eligibility_version
+
+Revision ID: 5a8f0d3c9e12
+Revises: e93a27c4b6f1
+Create Date: 2026-10-17 14:21:09.772431
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a8f0d3c9e12'
+down_revision: Union[str, Sequence[str], None] = 'e93a27c4b6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Versión de elegibilidad por miembro para exportar deltas a los kioscos
+    op.execute("CREATE SEQUENCE eligibility_version_seq")
+    op.add_column('members', sa.Column(
+        'eligibility_version',
+        sa.BigInteger(),
+        server_default=sa.text("nextval('eligibility_version_seq')"),
+        nullable=False
+    ))
+    op.create_index('ix_members_eligibility_version', 'members', ['eligibility_version'], unique=False)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_member_eligibility_version()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NEW.is_active IS DISTINCT FROM OLD.is_active
+               OR NEW.first_name IS DISTINCT FROM OLD.first_name
+               OR NEW.last_name_paternal IS DISTINCT FROM OLD.last_name_paternal
+               OR NEW.last_name_maternal IS DISTINCT FROM OLD.last_name_maternal THEN
+                NEW.eligibility_version := nextval('eligibility_version_seq');
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER members_eligibility_version
+        BEFORE UPDATE ON members
+        FOR EACH ROW EXECUTE FUNCTION bump_member_eligibility_version();
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_subscription_member_eligibility()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND NEW.status IS NOT DISTINCT FROM OLD.status
+               AND NEW.end_date IS NOT DISTINCT FROM OLD.end_date
+               AND NEW.member_id IS NOT DISTINCT FROM OLD.member_id THEN
+                RETURN NULL;
+            END IF;
+            UPDATE members
+            SET eligibility_version = nextval('eligibility_version_seq')
+            WHERE id IN (
+                CASE WHEN TG_OP <> 'DELETE' THEN NEW.member_id END,
+                CASE WHEN TG_OP <> 'INSERT' THEN OLD.member_id END
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER subscriptions_eligibility_version
+        AFTER INSERT OR UPDATE OR DELETE ON subscriptions
+        FOR EACH ROW EXECUTE FUNCTION bump_subscription_member_eligibility();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS subscriptions_eligibility_version ON subscriptions")
+    op.execute("DROP FUNCTION IF EXISTS bump_subscription_member_eligibility()")
+    op.execute("DROP TRIGGER IF EXISTS members_eligibility_version ON members")
+    op.execute("DROP FUNCTION IF EXISTS bump_member_eligibility_version()")
+    op.drop_index('ix_members_eligibility_version', table_name='members')
+    op.drop_column('members', 'eligibility_version')
+    op.execute("DROP SEQUENCE eligibility_version_seq")
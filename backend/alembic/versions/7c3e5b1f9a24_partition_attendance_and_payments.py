@@ -0,0 +1,129 @@
+"""partition_attendance_and_payments
+
+Revision ID: 7c3e5b1f9a24
+Revises: 5a8f0d3c9e12
+Create Date: 2026-10-17 15:08:42.316907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e5b1f9a24'
+down_revision: Union[str, Sequence[str], None] = '5a8f0d3c9e12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 3
+
+# Crea la partición mensual {parent}_YYYY_MM si no existe. La usa también la
+# tarea partition_maintenance (shared/partitions.py).
+CREATE_PARTITION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION create_monthly_partition(parent text, month date)
+    RETURNS boolean AS $$
+    DECLARE
+        start_date date := date_trunc('month', month)::date;
+        partition_name text := format('%s_%s', parent, to_char(start_date, 'YYYY_MM'));
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN false;
+        END IF;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent, start_date, (start_date + interval '1 month')::date
+        );
+        RETURN true;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def _partition_by_month(table: str, key: str) -> None:
+    """Reemplazar table por una tabla particionada por mes con los mismos datos"""
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+    op.execute(f"""
+        CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS)
+        PARTITION BY RANGE ({key})
+    """)
+    # Particiones desde el mes más antiguo hasta MONTHS_AHEAD meses adelante;
+    # la partición default sólo recibe fechas fuera de ese rango
+    op.execute(f"""
+        SELECT create_monthly_partition('{table}', m::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min({key}) FROM {table}_unpartitioned), current_date)),
+            date_trunc('month', current_date) + interval '{MONTHS_AHEAD} months',
+            interval '1 month'
+        ) AS m
+    """)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {table}_unpartitioned")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.execute(f"DROP TABLE {table}_unpartitioned")
+    # La llave de partición debe formar parte de la llave primaria
+    op.create_primary_key(f'{table}_pkey', table, ['id', key])
+    op.create_index(f'ix_{table}_id', table, ['id'], unique=False)
+    op.create_index(f'ix_{table}_{key}', table, [key], unique=False)
+
+
+def _unpartition(table: str) -> None:
+    """Regresar a una tabla normal (las particiones desprendidas no se reincorporan)"""
+    op.execute(f"CREATE TABLE {table}_plain (LIKE {table} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {table}_plain SELECT * FROM {table}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}_plain.id")
+    op.execute(f"DROP TABLE {table} CASCADE")
+    op.execute(f"ALTER TABLE {table}_plain RENAME TO {table}")
+    op.create_primary_key(f'{table}_pkey', table, ['id'])
+    op.create_index(f'ix_{table}_id', table, ['id'], unique=False)
+
+
+def upgrade() -> None:
+    op.execute(CREATE_PARTITION_FUNCTION)
+
+    _partition_by_month('attendance', 'date')
+    op.create_foreign_key('attendance_member_id_fkey', 'attendance', 'members', ['member_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('attendance_subscription_id_fkey', 'attendance', 'subscriptions', ['subscription_id'], ['id'], ondelete='SET NULL')
+    # Un índice único en una tabla particionada debe incluir la llave de partición
+    op.create_index(
+        'uq_attendance_open_member',
+        'attendance',
+        ['member_id', 'date'],
+        unique=True,
+        postgresql_where=sa.text('check_out_time IS NULL')
+    )
+    op.execute("""
+        CREATE TRIGGER attendance_notify
+        AFTER INSERT OR UPDATE OR DELETE ON attendance
+        FOR EACH ROW EXECUTE FUNCTION notify_attendance_change();
+    """)
+
+    _partition_by_month('payment_records', 'payment_date')
+    op.create_foreign_key('payment_records_subscription_id_fkey', 'payment_records', 'subscriptions', ['subscription_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('payment_records_member_id_fkey', 'payment_records', 'members', ['member_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    _unpartition('payment_records')
+    op.create_foreign_key('payment_records_subscription_id_fkey', 'payment_records', 'subscriptions', ['subscription_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('payment_records_member_id_fkey', 'payment_records', 'members', ['member_id'], ['id'], ondelete='CASCADE')
+
+    _unpartition('attendance')
+    op.create_foreign_key('attendance_member_id_fkey', 'attendance', 'members', ['member_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('attendance_subscription_id_fkey', 'attendance', 'subscriptions', ['subscription_id'], ['id'], ondelete='SET NULL')
+    op.create_index(
+        'uq_attendance_open_member',
+        'attendance',
+        ['member_id'],
+        unique=True,
+        postgresql_where=sa.text('check_out_time IS NULL')
+    )
+    op.execute("""
+        CREATE TRIGGER attendance_notify
+        AFTER INSERT OR UPDATE OR DELETE ON attendance
+        FOR EACH ROW EXECUTE FUNCTION notify_attendance_change();
+    """)
+
+    op.execute("DROP FUNCTION IF EXISTS create_monthly_partition(text, date)")
@@ -0,0 +1,46 @@
+"""unique_open_attendance_per_member
+
+Revision ID: 8b2d4e6f1a03
+Revises: 3f7c1a9d2e45
+Create Date: 2026-10-17 11:40:52.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4e6f1a03'
+down_revision: Union[str, Sequence[str], None] = '3f7c1a9d2e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Cerrar sesiones abiertas duplicadas (se conserva la más reciente de cada miembro)
+    op.execute("""
+        UPDATE attendance a
+        SET check_out_time = a.check_in_time + interval '4 hours',
+            duration_minutes = 240,
+            notes = COALESCE(NULLIF(a.notes, '') || ' [Cierre por duplicado]', 'Cierre por duplicado')
+        FROM (
+            SELECT id,
+                   row_number() OVER (PARTITION BY member_id ORDER BY check_in_time DESC, id DESC) AS rn
+            FROM attendance
+            WHERE check_out_time IS NULL
+        ) d
+        WHERE a.id = d.id AND d.rn > 1
+    """)
+    op.create_index(
+        'uq_attendance_open_member',
+        'attendance',
+        ['member_id'],
+        unique=True,
+        postgresql_where=sa.text('check_out_time IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_attendance_open_member', table_name='attendance')
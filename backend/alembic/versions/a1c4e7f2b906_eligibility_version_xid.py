@@ -0,0 +1,78 @@
+"""eligibility_version_xid
+
+Revision ID: a1c4e7f2b906
+Revises: f7d3b8a1c520
+Create Date: 2026-10-17 20:31:47.118902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c4e7f2b906'
+down_revision: Union[str, Sequence[str], None] = 'f7d3b8a1c520'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# eligibility_version pasa a ser el id de la transacción que hizo el cambio.
+# Un valor de secuencia se asigna antes del commit, así que una transacción
+# lenta podía confirmar una versión menor que la ya exportada; con xids la
+# exportación corta en pg_snapshot_xmin y nada en vuelo queda atrás
+CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
+
+def _set_version_functions(value: str) -> None:
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION bump_member_eligibility_version()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF NEW.is_active IS DISTINCT FROM OLD.is_active
+               OR NEW.first_name IS DISTINCT FROM OLD.first_name
+               OR NEW.last_name_paternal IS DISTINCT FROM OLD.last_name_paternal
+               OR NEW.last_name_maternal IS DISTINCT FROM OLD.last_name_maternal THEN
+                NEW.eligibility_version := {value};
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION bump_subscription_member_eligibility()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND NEW.status IS NOT DISTINCT FROM OLD.status
+               AND NEW.end_date IS NOT DISTINCT FROM OLD.end_date
+               AND NEW.member_id IS NOT DISTINCT FROM OLD.member_id THEN
+                RETURN NULL;
+            END IF;
+            UPDATE members
+            SET eligibility_version = {value}
+            WHERE id IN (
+                CASE WHEN TG_OP <> 'DELETE' THEN NEW.member_id END,
+                CASE WHEN TG_OP <> 'INSERT' THEN OLD.member_id END
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+
+def upgrade() -> None:
+    _set_version_functions(CURRENT_XID)
+    op.alter_column('members', 'eligibility_version', server_default=sa.text(CURRENT_XID))
+    # Las versiones de la secuencia no se comparan con xids: todos los
+    # kioscos recibirán una vez a todos los miembros
+    op.execute(f"UPDATE members SET eligibility_version = {CURRENT_XID}")
+    op.execute("DROP SEQUENCE eligibility_version_seq")
+
+
+def downgrade() -> None:
+    op.execute("CREATE SEQUENCE eligibility_version_seq")
+    op.execute("SELECT setval('eligibility_version_seq', (SELECT COALESCE(max(eligibility_version), 0) + 1 FROM members))")
+    op.alter_column('members', 'eligibility_version', server_default=sa.text("nextval('eligibility_version_seq')"))
+    _set_version_functions("nextval('eligibility_version_seq')")
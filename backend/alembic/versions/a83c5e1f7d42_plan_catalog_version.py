@@ -0,0 +1,57 @@
+"""plan_catalog_version
+
+Revision ID: a83c5e1f7d42
+Revises: f61b3d9a8e27
+Create Date: 2026-10-17 18:20:41.530872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83c5e1f7d42'
+down_revision: Union[str, Sequence[str], None] = 'f61b3d9a8e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Versión de cada catálogo cacheado en memoria (por ahora sólo 'plans')
+    op.create_table(
+        'catalog_versions',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.execute("INSERT INTO catalog_versions (name, version) VALUES ('plans', 1)")
+
+    # Cualquier cambio a plans sube la versión dentro de la misma transacción
+    # y avisa a los workers por el canal 'plans' al hacer commit
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_plans_catalog_version()
+        RETURNS trigger AS $$
+        DECLARE
+            new_version bigint;
+        BEGIN
+            UPDATE catalog_versions SET version = version + 1
+            WHERE name = 'plans'
+            RETURNING version INTO new_version;
+
+            PERFORM pg_notify('plans', json_build_object('version', new_version)::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER plans_catalog_version
+        AFTER INSERT OR UPDATE OR DELETE ON plans
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_plans_catalog_version();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS plans_catalog_version ON plans")
+    op.execute("DROP FUNCTION IF EXISTS bump_plans_catalog_version()")
+    op.drop_table('catalog_versions')
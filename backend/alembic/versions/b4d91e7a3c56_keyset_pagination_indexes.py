@@ -0,0 +1,33 @@
+"""keyset_pagination_indexes
+
+Revision ID: b4d91e7a3c56
+Revises: 7c3e5b1f9a24
+Create Date: 2026-10-17 16:20:13.508214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d91e7a3c56'
+down_revision: Union[str, Sequence[str], None] = '7c3e5b1f9a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Índices compuestos (orden, id) para la paginación por cursor
+    op.create_index('ix_attendance_check_in_time_id', 'attendance', ['check_in_time', 'id'], unique=False)
+    op.create_index('ix_payment_records_payment_date_id', 'payment_records', ['payment_date', 'id'], unique=False)
+    op.create_index('ix_subscriptions_created_at_id', 'subscriptions', ['created_at', 'id'], unique=False)
+    op.create_index('ix_members_created_at_id', 'members', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_members_created_at_id', table_name='members')
+    op.drop_index('ix_subscriptions_created_at_id', table_name='subscriptions')
+    op.drop_index('ix_payment_records_payment_date_id', table_name='payment_records')
+    op.drop_index('ix_attendance_check_in_time_id', table_name='attendance')
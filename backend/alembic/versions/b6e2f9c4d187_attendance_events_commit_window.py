@@ -0,0 +1,38 @@
+"""attendance_events_commit_window
+
+Revision ID: b6e2f9c4d187
+Revises: a1c4e7f2b906
+Create Date: 2026-10-17 20:58:33.902614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2f9c4d187'
+down_revision: Union[str, Sequence[str], None] = 'a1c4e7f2b906'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # El id sigue el orden de inserción, no el de commit. Con la transacción
+    # del evento y el xmin de su snapshot, al reanudar después del evento N se
+    # reenvían también los de id menor que seguían en vuelo cuando se insertó N
+    op.add_column('attendance_events', sa.Column(
+        'txid', sa.BigInteger(), server_default=sa.text("pg_current_xact_id()::text::bigint"), nullable=True
+    ))
+    op.add_column('attendance_events', sa.Column(
+        'snapshot_xmin', sa.BigInteger(),
+        server_default=sa.text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint"), nullable=True
+    ))
+    op.create_index('ix_attendance_events_txid', 'attendance_events', ['txid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_attendance_events_txid', table_name='attendance_events')
+    op.drop_column('attendance_events', 'snapshot_xmin')
+    op.drop_column('attendance_events', 'txid')
@@ -0,0 +1,37 @@
+"""member_birthday_index
+
+Revision ID: c3f8a2d6e914
+Revises: a83c5e1f7d42
+Create Date: 2026-10-17 18:52:13.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a2d6e914'
+down_revision: Union[str, Sequence[str], None] = 'a83c5e1f7d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Mes y día como entero (15 de marzo -> 315), para buscar cumpleaños por rango
+    op.execute("""
+        CREATE OR REPLACE FUNCTION birthday_mmdd(date)
+        RETURNS integer AS $$
+            SELECT (extract(month FROM $1) * 100 + extract(day FROM $1))::integer
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+    """)
+    op.execute("""
+        CREATE INDEX ix_members_birthday_mmdd ON members (birthday_mmdd(date_of_birth))
+        WHERE is_active AND date_of_birth IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_members_birthday_mmdd")
+    op.execute("DROP FUNCTION IF EXISTS birthday_mmdd(date)")
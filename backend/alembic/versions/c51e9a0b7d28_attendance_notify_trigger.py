@@ -0,0 +1,75 @@
+"""attendance_notify_trigger
+
+Revision ID: c51e9a0b7d28
+Revises: 8b2d4e6f1a03
+Create Date: 2026-10-17 12:15:37.551842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51e9a0b7d28'
+down_revision: Union[str, Sequence[str], None] = '8b2d4e6f1a03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Publica en el canal "attendance" cada entrada, salida y borrado.
+    # El auto-checkout se distingue con SET LOCAL app.checkout_kind = 'auto'.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_attendance_change()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            event_op text;
+            row_data attendance;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                event_op := 'delete';
+                row_data := OLD;
+            ELSIF TG_OP = 'INSERT' AND NEW.check_out_time IS NULL THEN
+                event_op := 'check_in';
+                row_data := NEW;
+            ELSIF TG_OP = 'UPDATE' AND OLD.check_out_time IS NULL AND NEW.check_out_time IS NOT NULL THEN
+                IF current_setting('app.checkout_kind', true) = 'auto' THEN
+                    event_op := 'auto_checkout';
+                ELSE
+                    event_op := 'check_out';
+                END IF;
+                row_data := NEW;
+            ELSE
+                RETURN NULL;
+            END IF;
+
+            PERFORM pg_notify('attendance', json_build_object(
+                'op', event_op,
+                'attendance', row_to_json(row_data),
+                'member', COALESCE((
+                    SELECT json_build_object(
+                        'first_name', m.first_name,
+                        'last_name_paternal', m.last_name_paternal,
+                        'last_name_maternal', m.last_name_maternal,
+                        'email', m.email,
+                        'phone', m.phone
+                    )
+                    FROM members m WHERE m.id = row_data.member_id
+                ), '{}'::json)
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER attendance_notify
+        AFTER INSERT OR UPDATE OR DELETE ON attendance
+        FOR EACH ROW EXECUTE FUNCTION notify_attendance_change();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS attendance_notify ON attendance")
+    op.execute("DROP FUNCTION IF EXISTS notify_attendance_change()")
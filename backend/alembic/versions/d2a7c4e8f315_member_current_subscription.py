@@ -0,0 +1,98 @@
+"""member_current_subscription
+
+Revision ID: d2a7c4e8f315
+Revises: b4d91e7a3c56
+Create Date: 2026-10-17 17:02:37.915420
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c4e8f315'
+down_revision: Union[str, Sequence[str], None] = 'b4d91e7a3c56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Suscripción vigente de cada miembro (la 'active' con end_date más lejano)
+    op.add_column('members', sa.Column('current_subscription_id', sa.Integer(), nullable=True))
+    op.add_column('members', sa.Column('current_subscription_end_date', sa.Date(), nullable=True))
+    op.create_foreign_key(
+        'members_current_subscription_id_fkey', 'members', 'subscriptions',
+        ['current_subscription_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index('ix_members_current_subscription_end_date', 'members', ['current_subscription_end_date'], unique=False)
+
+    op.execute("""
+        UPDATE members m
+        SET current_subscription_id = cur.id,
+            current_subscription_end_date = cur.end_date
+        FROM (
+            SELECT DISTINCT ON (member_id) member_id, id, end_date
+            FROM subscriptions
+            WHERE status = 'active'
+            ORDER BY member_id, end_date DESC, id DESC
+        ) cur
+        WHERE cur.member_id = m.id
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION refresh_member_current_subscription(target_member_id integer)
+        RETURNS void AS $$
+            UPDATE members m
+            SET current_subscription_id = cur.id,
+                current_subscription_end_date = cur.end_date
+            FROM (SELECT 1) one
+            LEFT JOIN LATERAL (
+                SELECT s.id, s.end_date
+                FROM subscriptions s
+                WHERE s.member_id = target_member_id
+                  AND s.status = 'active'
+                ORDER BY s.end_date DESC, s.id DESC
+                LIMIT 1
+            ) cur ON true
+            WHERE m.id = target_member_id
+              AND (m.current_subscription_id IS DISTINCT FROM cur.id
+                   OR m.current_subscription_end_date IS DISTINCT FROM cur.end_date);
+        $$ LANGUAGE sql;
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION refresh_subscription_member_pointer()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND NEW.status IS NOT DISTINCT FROM OLD.status
+               AND NEW.end_date IS NOT DISTINCT FROM OLD.end_date
+               AND NEW.member_id IS NOT DISTINCT FROM OLD.member_id THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM refresh_member_current_subscription(NEW.member_id);
+            END IF;
+            IF TG_OP = 'DELETE' OR OLD.member_id IS DISTINCT FROM NEW.member_id THEN
+                PERFORM refresh_member_current_subscription(OLD.member_id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER subscriptions_current_pointer
+        AFTER INSERT OR UPDATE OR DELETE ON subscriptions
+        FOR EACH ROW EXECUTE FUNCTION refresh_subscription_member_pointer();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS subscriptions_current_pointer ON subscriptions")
+    op.execute("DROP FUNCTION IF EXISTS refresh_subscription_member_pointer()")
+    op.execute("DROP FUNCTION IF EXISTS refresh_member_current_subscription(integer)")
+    op.drop_index('ix_members_current_subscription_end_date', table_name='members')
+    op.drop_constraint('members_current_subscription_id_fkey', 'members', type_='foreignkey')
+    op.drop_column('members', 'current_subscription_end_date')
+    op.drop_column('members', 'current_subscription_id')
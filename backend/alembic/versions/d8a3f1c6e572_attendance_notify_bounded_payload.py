@@ -0,0 +1,136 @@
+"""attendance_notify_bounded_payload
+
+Revision ID: d8a3f1c6e572
+Revises: b6e2f9c4d187
+Create Date: 2026-10-17 22:41:09.318264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f1c6e572'
+down_revision: Union[str, Sequence[str], None] = 'b6e2f9c4d187'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_attendance_change()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        event_op text;
+        row_data attendance;
+        payload jsonb;
+        new_event_id bigint;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            event_op := 'delete';
+            row_data := OLD;
+        ELSIF TG_OP = 'INSERT' AND NEW.check_out_time IS NULL THEN
+            event_op := 'check_in';
+            row_data := NEW;
+        ELSIF TG_OP = 'UPDATE' AND OLD.check_out_time IS NULL AND NEW.check_out_time IS NOT NULL THEN
+            IF current_setting('app.checkout_kind', true) = 'auto' THEN
+                event_op := 'auto_checkout';
+            ELSE
+                event_op := 'check_out';
+            END IF;
+            row_data := NEW;
+        ELSE
+            RETURN NULL;
+        END IF;
+
+        -- notes es Text sin límite y pg_notify falla con 8000 bytes o más,
+        -- lo que abortaría el INSERT/UPDATE de la asistencia; el resto de los
+        -- campos tiene tamaño acotado. La nota completa queda en attendance.
+        payload := jsonb_build_object(
+            'op', event_op,
+            'attendance', jsonb_set(
+                to_jsonb(row_data),
+                '{notes}',
+                COALESCE(to_jsonb(left(row_data.notes, 500)), 'null'::jsonb)
+            ),
+            'member', COALESCE((
+                SELECT jsonb_build_object(
+                    'first_name', m.first_name,
+                    'last_name_paternal', m.last_name_paternal,
+                    'last_name_maternal', m.last_name_maternal,
+                    'email', m.email,
+                    'phone', m.phone
+                )
+                FROM members m WHERE m.id = row_data.member_id
+            ), '{}'::jsonb)
+        );
+
+        INSERT INTO attendance_events (op, attendance_id, member_id, payload)
+        VALUES (event_op, row_data.id, row_data.member_id, payload)
+        RETURNING id INTO new_event_id;
+
+        PERFORM pg_notify('attendance', (payload || jsonb_build_object('event_id', new_event_id))::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_attendance_change()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        event_op text;
+        row_data attendance;
+        payload jsonb;
+        new_event_id bigint;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            event_op := 'delete';
+            row_data := OLD;
+        ELSIF TG_OP = 'INSERT' AND NEW.check_out_time IS NULL THEN
+            event_op := 'check_in';
+            row_data := NEW;
+        ELSIF TG_OP = 'UPDATE' AND OLD.check_out_time IS NULL AND NEW.check_out_time IS NOT NULL THEN
+            IF current_setting('app.checkout_kind', true) = 'auto' THEN
+                event_op := 'auto_checkout';
+            ELSE
+                event_op := 'check_out';
+            END IF;
+            row_data := NEW;
+        ELSE
+            RETURN NULL;
+        END IF;
+
+        payload := jsonb_build_object(
+            'op', event_op,
+            'attendance', to_jsonb(row_data),
+            'member', COALESCE((
+                SELECT jsonb_build_object(
+                    'first_name', m.first_name,
+                    'last_name_paternal', m.last_name_paternal,
+                    'last_name_maternal', m.last_name_maternal,
+                    'email', m.email,
+                    'phone', m.phone
+                )
+                FROM members m WHERE m.id = row_data.member_id
+            ), '{}'::jsonb)
+        );
+
+        INSERT INTO attendance_events (op, attendance_id, member_id, payload)
+        VALUES (event_op, row_data.id, row_data.member_id, payload)
+        RETURNING id INTO new_event_id;
+
+        PERFORM pg_notify('attendance', (payload || jsonb_build_object('event_id', new_event_id))::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    op.execute(NOTIFY_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_NOTIFY_FUNCTION)
@@ -0,0 +1,40 @@
+"""subscription_balance_due
+
+Revision ID: e5b19d7c2a63
+Revises: c3f8a2d6e914
+Create Date: 2026-10-17 19:14:50.281736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b19d7c2a63'
+down_revision: Union[str, Sequence[str], None] = 'c3f8a2d6e914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Saldo pendiente contra el precio congelado al contratar (plan_price)
+    op.add_column('subscriptions', sa.Column(
+        'balance_due',
+        sa.DECIMAL(10, 2),
+        sa.Computed('plan_price - COALESCE(amount_paid, 0)', persisted=True),
+        nullable=True
+    ))
+    # Cuentas por cobrar: suscripciones activas con saldo
+    op.create_index(
+        'ix_subscriptions_receivable', 'subscriptions', ['end_date', 'id'],
+        unique=False,
+        postgresql_include=['balance_due'],
+        postgresql_where=sa.text("status = 'active' AND balance_due > 0")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_subscriptions_receivable', table_name='subscriptions')
+    op.drop_column('subscriptions', 'balance_due')
@@ -0,0 +1,133 @@
+"""create_attendance_events
+
+Revision ID: e93a27c4b6f1
+Revises: c51e9a0b7d28
+Create Date: 2026-10-17 13:02:48.120375
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e93a27c4b6f1'
+down_revision: Union[str, Sequence[str], None] = 'c51e9a0b7d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_attendance_change()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        event_op text;
+        row_data attendance;
+        payload jsonb;
+        new_event_id bigint;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            event_op := 'delete';
+            row_data := OLD;
+        ELSIF TG_OP = 'INSERT' AND NEW.check_out_time IS NULL THEN
+            event_op := 'check_in';
+            row_data := NEW;
+        ELSIF TG_OP = 'UPDATE' AND OLD.check_out_time IS NULL AND NEW.check_out_time IS NOT NULL THEN
+            IF current_setting('app.checkout_kind', true) = 'auto' THEN
+                event_op := 'auto_checkout';
+            ELSE
+                event_op := 'check_out';
+            END IF;
+            row_data := NEW;
+        ELSE
+            RETURN NULL;
+        END IF;
+
+        payload := jsonb_build_object(
+            'op', event_op,
+            'attendance', to_jsonb(row_data),
+            'member', COALESCE((
+                SELECT jsonb_build_object(
+                    'first_name', m.first_name,
+                    'last_name_paternal', m.last_name_paternal,
+                    'last_name_maternal', m.last_name_maternal,
+                    'email', m.email,
+                    'phone', m.phone
+                )
+                FROM members m WHERE m.id = row_data.member_id
+            ), '{}'::jsonb)
+        );
+
+        INSERT INTO attendance_events (op, attendance_id, member_id, payload)
+        VALUES (event_op, row_data.id, row_data.member_id, payload)
+        RETURNING id INTO new_event_id;
+
+        PERFORM pg_notify('attendance', (payload || jsonb_build_object('event_id', new_event_id))::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION notify_attendance_change()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        event_op text;
+        row_data attendance;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            event_op := 'delete';
+            row_data := OLD;
+        ELSIF TG_OP = 'INSERT' AND NEW.check_out_time IS NULL THEN
+            event_op := 'check_in';
+            row_data := NEW;
+        ELSIF TG_OP = 'UPDATE' AND OLD.check_out_time IS NULL AND NEW.check_out_time IS NOT NULL THEN
+            IF current_setting('app.checkout_kind', true) = 'auto' THEN
+                event_op := 'auto_checkout';
+            ELSE
+                event_op := 'check_out';
+            END IF;
+            row_data := NEW;
+        ELSE
+            RETURN NULL;
+        END IF;
+
+        PERFORM pg_notify('attendance', json_build_object(
+            'op', event_op,
+            'attendance', row_to_json(row_data),
+            'member', COALESCE((
+                SELECT json_build_object(
+                    'first_name', m.first_name,
+                    'last_name_paternal', m.last_name_paternal,
+                    'last_name_maternal', m.last_name_maternal,
+                    'email', m.email,
+                    'phone', m.phone
+                )
+                FROM members m WHERE m.id = row_data.member_id
+            ), '{}'::json)
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    op.create_table('attendance_events',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('op', sa.String(length=20), nullable=False),
+    sa.Column('attendance_id', sa.Integer(), nullable=False),
+    sa.Column('member_id', sa.Integer(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_attendance_events_created_at'), 'attendance_events', ['created_at'], unique=False)
+    op.execute(NOTIFY_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_NOTIFY_FUNCTION)
+    op.drop_index(op.f('ix_attendance_events_created_at'), table_name='attendance_events')
+    op.drop_table('attendance_events')
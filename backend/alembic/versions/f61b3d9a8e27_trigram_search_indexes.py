@@ -0,0 +1,56 @@
+"""trigram_search_indexes
+
+Revision ID: f61b3d9a8e27
+Revises: d2a7c4e8f315
+Create Date: 2026-10-17 17:48:05.264119
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f61b3d9a8e27'
+down_revision: Union[str, Sequence[str], None] = 'd2a7c4e8f315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+
+    # unaccent() es STABLE; los índices de expresión requieren funciones IMMUTABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text)
+        RETURNS text AS $$
+            SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+    """)
+    # Texto normalizado (minúsculas, sin acentos) sobre el que busca get_members
+    op.execute("""
+        CREATE OR REPLACE FUNCTION member_search_text(
+            first_name text, last_name_paternal text, last_name_maternal text, email text, phone text
+        )
+        RETURNS text AS $$
+            SELECT lower(immutable_unaccent(concat_ws(' ', first_name, last_name_paternal, last_name_maternal, email, phone)))
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+    """)
+
+    op.execute("""
+        CREATE INDEX ix_members_search_trgm ON members
+        USING gin (member_search_text(first_name, last_name_paternal, last_name_maternal, email, phone) gin_trgm_ops)
+    """)
+    op.execute("""
+        CREATE INDEX ix_plans_name_trgm ON plans
+        USING gin (lower(immutable_unaccent(name)) gin_trgm_ops)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_plans_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_members_search_trgm")
+    op.execute("DROP FUNCTION IF EXISTS member_search_text(text, text, text, text, text)")
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
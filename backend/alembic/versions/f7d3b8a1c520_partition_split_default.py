@@ -0,0 +1,106 @@
+"""partition_split_default
+
+Revision ID: f7d3b8a1c520
+Revises: e5b19d7c2a63
+Create Date: 2026-10-17 20:05:12.447103
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7d3b8a1c520'
+down_revision: Union[str, Sequence[str], None] = 'e5b19d7c2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Si la partición default ya tiene filas del mes, CREATE TABLE ... PARTITION OF
+# falla; en ese caso se desprende la default, se mueven las filas a la nueva
+# partición (como tablas sueltas, sin disparar triggers de la tabla padre) y
+# se vuelven a adjuntar ambas
+CREATE_PARTITION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION create_monthly_partition(parent text, month date)
+    RETURNS boolean AS $$
+    DECLARE
+        start_date date := date_trunc('month', month)::date;
+        end_date date := (date_trunc('month', month) + interval '1 month')::date;
+        partition_name text := format('%s_%s', parent, to_char(start_date, 'YYYY_MM'));
+        default_name text := format('%s_default', parent);
+        key_column text;
+        has_rows boolean := false;
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN false;
+        END IF;
+
+        SELECT a.attname INTO key_column
+        FROM pg_partitioned_table pt
+        JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+        WHERE pt.partrelid = parent::regclass;
+
+        IF to_regclass(default_name) IS NOT NULL THEN
+            EXECUTE format(
+                'SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                default_name, key_column, start_date, key_column, end_date
+            ) INTO has_rows;
+        END IF;
+
+        IF NOT has_rows THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent, start_date, end_date
+            );
+            RETURN true;
+        END IF;
+
+        RAISE NOTICE 'Moviendo filas de % a %', default_name, partition_name;
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, default_name);
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', partition_name, parent);
+        EXECUTE format(
+            'INSERT INTO %I SELECT * FROM %I WHERE %I >= %L AND %I < %L',
+            partition_name, default_name, key_column, start_date, key_column, end_date
+        );
+        EXECUTE format(
+            'DELETE FROM %I WHERE %I >= %L AND %I < %L',
+            default_name, key_column, start_date, key_column, end_date
+        );
+        EXECUTE format(
+            'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            parent, partition_name, start_date, end_date
+        );
+        EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I DEFAULT', parent, default_name);
+        RETURN true;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_PARTITION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION create_monthly_partition(parent text, month date)
+    RETURNS boolean AS $$
+    DECLARE
+        start_date date := date_trunc('month', month)::date;
+        partition_name text := format('%s_%s', parent, to_char(start_date, 'YYYY_MM'));
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN false;
+        END IF;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, parent, start_date, (start_date + interval '1 month')::date
+        );
+        RETURN true;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    op.execute(CREATE_PARTITION_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_PARTITION_FUNCTION)
@@ -0,0 +1,178 @@
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from shared.partitions import add_months
+
+logger = logging.getLogger(__name__)
+
+# Ruta absoluta en almacenamiento persistente (un disco de Render, no el
+# sistema de archivos efímero del deploy); sin ella no se archiva
+ATTENDANCE_ARCHIVE_DIR = os.getenv("ATTENDANCE_ARCHIVE_DIR", "")
+# Meses que se conservan en la tabla; 0 = no archivar (opcional)
+ATTENDANCE_ARCHIVE_AFTER_MONTHS = int(os.getenv("ATTENDANCE_ARCHIVE_AFTER_MONTHS", "0"))
+
+COLUMNS = ("id", "member_id", "subscription_id", "check_in_time", "check_out_time",
+           "date", "duration_minutes", "notes", "created_at")
+DATETIME_COLUMNS = ("check_in_time", "check_out_time", "created_at")
+FILE_PATTERN = re.compile(r"^attendance_(\d{4})_(\d{2})\.json\.gz$")
+
+
+def archive_path(month: date) -> str:
+    return os.path.join(ATTENDANCE_ARCHIVE_DIR, f"attendance_{month:%Y_%m}.json.gz")
+
+
+def partition_name(month: date) -> str:
+    return f"attendance_{month:%Y_%m}"
+
+
+def write_month(month: date, rows: list):
+    """Escribir un mes en formato columnar (una lista por columna) comprimido con gzip"""
+    os.makedirs(ATTENDANCE_ARCHIVE_DIR, exist_ok=True)
+    data = {column: [getattr(row, column) for row in rows] for column in COLUMNS}
+    body = {"month": month.isoformat(), "rows": len(rows), "columns": data}
+    path = archive_path(month)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(body, f, default=str, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_month(month: date) -> Dict[str, list]:
+    with gzip.open(archive_path(month), "rt", encoding="utf-8") as f:
+        return json.load(f)["columns"]
+
+
+def verify_month(month: date, rows: list) -> bool:
+    """Releer el archivo escrito y compararlo con las filas de la partición"""
+    try:
+        columns = read_month(month)
+    except (OSError, ValueError, KeyError):
+        logger.exception("No se pudo releer %s", archive_path(month))
+        return False
+    return columns.get("id") == [row.id for row in rows] and all(
+        len(columns.get(column, ())) == len(rows) for column in COLUMNS
+    )
+
+
+def archive_month(db: Session, month: date) -> int:
+    """Archivar la partición de un mes y eliminarla. No hace commit.
+
+    La partición (adjunta o ya desprendida) se borra con DROP TABLE, sin
+    disparar attendance_notify, y sólo después de verificar el archivo; los
+    meses sin partición propia no se archivan. Si la partición está adjunta,
+    el DROP bloquea attendance hasta el commit, así que hay que confirmar en
+    cuanto regrese.
+    """
+    name = partition_name(month)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+        return 0
+    rows = db.execute(text(f'SELECT {", ".join(COLUMNS)} FROM "{name}" ORDER BY id')).all()
+    if any(row.check_out_time is None for row in rows):
+        logger.warning("La partición %s tiene sesiones abiertas; no se archiva", name)
+        return 0
+    write_month(month, rows)
+    if not verify_month(month, rows):
+        raise RuntimeError(f"El archivo {archive_path(month)} no coincide con la partición {name}")
+    db.execute(text(f'DROP TABLE "{name}"'))
+    logger.info("Partición %s archivada en %s (%s filas)", name, archive_path(month), len(rows))
+    return len(rows)
+
+
+def archive_job(db: Session) -> int:
+    """Tarea del scheduler: archivar los meses anteriores al límite.
+
+    Cada mes va en su propia transacción, para que el lock del DROP sobre
+    attendance dure sólo lo que tarda ese mes.
+    """
+    if ATTENDANCE_ARCHIVE_AFTER_MONTHS <= 0:
+        return 0
+    if not os.path.isabs(ATTENDANCE_ARCHIVE_DIR):
+        raise RuntimeError("ATTENDANCE_ARCHIVE_DIR debe ser una ruta absoluta en almacenamiento persistente")
+    cutoff = add_months(date.today().replace(day=1), -ATTENDANCE_ARCHIVE_AFTER_MONTHS)
+    names = db.execute(text("""
+        SELECT relname FROM pg_class
+        WHERE relkind IN ('r', 'p') AND relname ~ '^attendance_[0-9]{4}_[0-9]{2}$'
+    """)).scalars().all()
+    archived = 0
+    for name in sorted(names):
+        month = date(int(name[11:15]), int(name[16:18]), 1)
+        if month >= cutoff:
+            continue
+        month_db = SessionLocal()
+        try:
+            archived += archive_month(month_db, month)
+            month_db.commit()
+        except Exception:
+            month_db.rollback()
+            raise
+        finally:
+            month_db.close()
+    return archived
+
+
+def archive_files() -> List[date]:
+    """Meses con archivo en disco"""
+    if not os.path.isdir(ATTENDANCE_ARCHIVE_DIR):
+        return []
+    months = []
+    for filename in os.listdir(ATTENDANCE_ARCHIVE_DIR):
+        match = FILE_PATTERN.match(filename)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def archived_months(db: Session, months: List[date]) -> List[date]:
+    """De months, los que ya no tienen partición (evita contar dos veces un
+    mes cuyo DROP no alcanzó a confirmarse)"""
+    if not months:
+        return []
+    existing = set(db.execute(
+        text("SELECT relname FROM pg_class WHERE relname = ANY(:names)"),
+        {"names": [partition_name(m) for m in months]}
+    ).scalars().all())
+    return [m for m in months if partition_name(m) not in existing]
+
+
+def load_archived(
+    db: Session,
+    start_date: date,
+    end_date: Optional[date] = None,
+    member_id: Optional[int] = None
+) -> List[dict]:
+    """Asistencias archivadas entre start_date y end_date (inclusive).
+
+    Sólo lee archivos cuando el rango llega a meses archivados.
+    """
+    first_month = start_date.replace(day=1)
+    months = archived_months(db, [
+        m for m in archive_files()
+        if m >= first_month and (end_date is None or m <= end_date)
+    ])
+    result = []
+    for month in months:
+        columns = read_month(month)
+        for i in range(len(columns["id"])):
+            if member_id is not None and columns["member_id"][i] != member_id:
+                continue
+            row_date = date.fromisoformat(columns["date"][i])
+            if row_date < start_date or (end_date is not None and row_date > end_date):
+                continue
+            row = {column: columns[column][i] for column in COLUMNS}
+            row["date"] = row_date
+            for column in DATETIME_COLUMNS:
+                if row[column] is not None:
+                    row[column] = datetime.fromisoformat(row[column])
+            result.append(row)
+    return result
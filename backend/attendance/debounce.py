@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from shared.events import publish
+
+ScanKey = Tuple[str, int]
+
+SCAN_DEBOUNCE_SECONDS = float(os.getenv("SCAN_DEBOUNCE_SECONDS", "3"))
+PRUNE_THRESHOLD = 1000
+
+
+class ScanDebouncer:
+    """
+    Respuesta del primer escaneo QR de cada miembro durante una ventana corta.
+
+    Las cámaras leen el mismo QR dos o tres veces seguidas; las lecturas
+    repetidas dentro de la ventana reciben la respuesta del primer escaneo sin
+    tocar la base de datos. La ventana se desliza con cada lectura repetida.
+    La llave es (endpoint, member_id): un escaneo en /qr-scan no responde por
+    uno en /qr-checkin. Los escaneos aceptados se recuerdan sólo después del
+    commit y se comparten con los demás workers por el canal "scans" del bus.
+    """
+
+    def __init__(self, window_seconds: float = SCAN_DEBOUNCE_SECONDS):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        # (endpoint, member_id) -> (última lectura, status_code, respuesta)
+        self._entries: Dict[ScanKey, Tuple[float, int, object]] = {}
+        self.suppressed = 0
+
+    def lookup(self, key: ScanKey) -> Optional[Tuple[int, object]]:
+        """Respuesta cacheada si el miembro escaneó en el endpoint dentro de la ventana"""
+        if self.window_seconds <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.window_seconds:
+                return None
+            self._entries[key] = (now, entry[1], entry[2])
+            self.suppressed += 1
+            return entry[1], entry[2]
+
+    def remember(self, key: ScanKey, status_code: int, body):
+        """Guardar una respuesta; las de escaneos aceptados, sólo ya confirmados"""
+        if self.window_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now, status_code, body)
+            if len(self._entries) > PRUNE_THRESHOLD:
+                self._prune(now)
+
+    def share(self, db: Session, key: ScanKey, status_code: int, body):
+        """Avisar a los demás workers; Postgres sólo lo entrega si la transacción
+        hace commit. El worker que atendió llama remember después del commit."""
+        endpoint, member_id = key
+        publish(db, "scans", {
+            "endpoint": endpoint, "member_id": member_id, "status_code": status_code, "body": body
+        })
+
+    def handle_event(self, event: dict):
+        """Handler del bus"""
+        self.remember((event["endpoint"], event["member_id"]), event["status_code"], event["body"])
+
+    def _prune(self, now: float):
+        expired = [
+            key for key, entry in self._entries.items()
+            if now - entry[0] > self.window_seconds
+        ]
+        for key in expired:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            tracked = sum(1 for entry in self._entries.values() if now - entry[0] <= self.window_seconds)
+            return {
+                "window_seconds": self.window_seconds,
+                "suppressed": self.suppressed,
+                "tracked_members": tracked
+            }
+
+
+scan_debouncer = ScanDebouncer()
@@ -0,0 +1,195 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from shared.events import publish
+
+MX = ZoneInfo("America/Mexico_City")
+
+ELIGIBILITY_CACHE_SIZE = int(os.getenv("ELIGIBILITY_CACHE_SIZE", "20000"))
+# Llave propia de los kioscos; no debe ser QR_SECRET, con la que se podrían
+# falsificar los QR de los miembros. Sin ella no se exporta
+ELIGIBILITY_SIGNING_KEY = os.getenv("ELIGIBILITY_SIGNING_KEY")
+
+
+class EligibilitySnapshot(NamedTuple):
+    member_id: int
+    is_active: bool
+    member_name: str
+    subscription_id: Optional[int]
+    end_date: Optional[date]
+    plan_name: Optional[str]
+
+    def is_eligible(self, today: date) -> bool:
+        return (
+            self.is_active
+            and self.subscription_id is not None
+            and self.end_date >= today
+        )
+
+
+class EligibilityCache:
+    """
+    Elegibilidad de cada miembro para hacer check-in.
+
+    Se invalida por miembro desde las rutas de members, subscriptions y
+    payments (canal "eligibility" del bus, para todos los workers). Mientras
+    el bus esté desconectado no se usa, porque podría perder invalidaciones.
+    """
+
+    def __init__(self, max_size: int = ELIGIBILITY_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[int, EligibilitySnapshot]" = OrderedDict()
+        # Sube con cada invalidación; put descarta lo leído antes de ella
+        self._generation = 0
+        self.ready = False
+
+    def generation(self) -> int:
+        """Tomar antes de leer de la base de datos y pasarla a put"""
+        return self._generation
+
+    def get(self, member_id: int) -> Optional[EligibilitySnapshot]:
+        if not self.ready:
+            return None
+        with self._lock:
+            snapshot = self._snapshots.get(member_id)
+            if snapshot is not None:
+                self._snapshots.move_to_end(member_id)
+            return snapshot
+
+    def put(self, snapshot: EligibilitySnapshot, generation: int):
+        if not self.ready:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._snapshots[snapshot.member_id] = snapshot
+            if len(self._snapshots) > self.max_size:
+                self._snapshots.popitem(last=False)
+
+    def invalidate(self, member_id: int):
+        with self._lock:
+            self._generation += 1
+            self._snapshots.pop(member_id, None)
+
+    def handle_event(self, event: dict):
+        """Handler del bus"""
+        member_id = event.get("member_id")
+        if member_id is None:
+            self.clear()
+        else:
+            self.invalidate(member_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshots.clear()
+
+    def enable(self):
+        """Handler on_connect: empezar con el caché vacío"""
+        with self._lock:
+            self._generation += 1
+            self._snapshots.clear()
+            self.ready = True
+
+    def disable(self):
+        with self._lock:
+            self._generation += 1
+            self.ready = False
+            self._snapshots.clear()
+
+
+def invalidate_eligibility(db: Session, member_id: Optional[int] = None):
+    """Invalidar la elegibilidad de un miembro (o de todos) al hacer commit"""
+    if member_id is None:
+        eligibility.clear()
+    else:
+        eligibility.invalidate(member_id)
+    publish(db, "eligibility", {"member_id": member_id})
+
+
+eligibility = EligibilityCache()
+
+
+# ── Exportación firmada para validación local en los kioscos ──
+
+# Mismas reglas que check_in_member: miembro activo con suscripción
+# 'active' vigente hoy
+EXPORT_SQL = text("""
+    SELECT m.id, m.is_active,
+           concat_ws(' ', m.first_name, m.last_name_paternal, NULLIF(m.last_name_maternal, '')) AS member_name,
+           s.end_date
+    FROM members m
+    LEFT JOIN LATERAL (
+        SELECT sub.end_date
+        FROM subscriptions sub
+        WHERE sub.member_id = m.id
+          AND sub.status = 'active'
+          AND sub.end_date >= :today
+        ORDER BY sub.end_date DESC
+        LIMIT 1
+    ) s ON true
+    WHERE m.eligibility_version >= :since
+      AND (:delta OR (m.is_active AND s.end_date IS NOT NULL))
+    ORDER BY m.id
+""")
+
+
+def name_hash(member_name: str) -> str:
+    return hashlib.sha256(member_name.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+def sign_snapshot(body: dict) -> str:
+    if not ELIGIBILITY_SIGNING_KEY:
+        raise RuntimeError("ELIGIBILITY_SIGNING_KEY no está configurada")
+    canonical = json.dumps(body, separators=(",", ":"), sort_keys=True)
+    return hmac.new(ELIGIBILITY_SIGNING_KEY.encode("utf-8"), canonical.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def export_eligibility(db: Session, since: Optional[int] = None, today: Optional[date] = None) -> dict:
+    """Snapshot firmado de los miembros que pueden entrar hoy.
+
+    Sin since: lista completa. Con since: sólo miembros cuya versión cambió
+    (elegibles en members, el resto en removed). El kiosco también debe
+    comparar end_date contra su fecha, porque el vencimiento no cambia versión.
+
+    version es el xmin del snapshot tomado antes de leer: toda transacción
+    con xid menor ya terminó y se ve en la lectura; las demás (aun las que
+    confirmen después) tienen versión >= y entran en el siguiente delta.
+    """
+    today = today or date.today()
+    version = db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar()
+    delta = since is not None
+    rows = db.execute(EXPORT_SQL, {
+        "today": today,
+        "since": since if delta else 0,
+        "delta": delta
+    }).all()
+
+    members, removed = [], []
+    for row in rows:
+        if row.is_active and row.end_date is not None:
+            members.append([row.id, row.end_date.isoformat(), name_hash(row.member_name)])
+        else:
+            removed.append(row.id)
+
+    body = {
+        "version": version,
+        "since": since,
+        "valid_on": today.isoformat(),
+        "generated_at": datetime.now(MX).isoformat(),
+        "members": members,
+        "removed": removed
+    }
+    body["signature"] = sign_snapshot(body)
+    return body
@@ -1,21 +1,48 @@
-from sqlalchemy import Column, Integer, Date, Text, ForeignKey
-from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy import Column, Integer, BigInteger, String, Date, Text, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import TIMESTAMP, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy import func
 from database import Base
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        # Una sola sesión abierta por miembro y día (la tabla está particionada
+        # por mes y el índice único debe incluir la llave de partición)
+        Index(
+            "uq_attendance_open_member",
+            "member_id",
+            "date",
+            unique=True,
+            postgresql_where=text("check_out_time IS NULL")
+        ),
+        # Paginación por cursor (check_in_time, id)
+        Index("ix_attendance_check_in_time_id", "check_in_time", "id"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     member_id = Column(Integer, ForeignKey("members.id", ondelete="CASCADE"), nullable=False)
     subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="SET NULL"))
     check_in_time = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
     check_out_time = Column(TIMESTAMP(timezone=True))
-    date = Column(Date, nullable=False, server_default=func.current_date())
+    date = Column(Date, primary_key=True, index=True, nullable=False, server_default=func.current_date())
     duration_minutes = Column(Integer)
     notes = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
     member = relationship("Member", back_populates="attendances")
-    subscription = relationship("Subscription", back_populates="attendances")
\ No newline at end of file
+    subscription = relationship("Subscription", back_populates="attendances")
+
+class AttendanceEvent(Base):
+    """Bitácora de eventos de asistencia (la llena el trigger attendance_notify)"""
+    __tablename__ = "attendance_events"
+
+    id = Column(BigInteger, primary_key=True)
+    op = Column(String(20), nullable=False)
+    attendance_id = Column(Integer, nullable=False)
+    member_id = Column(Integer, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), index=True)
+    # Transacción que insertó el evento y xmin de su snapshot (ver resume_window)
+    txid = Column(BigInteger, server_default=text("pg_current_xact_id()::text::bigint"), index=True)
+    snapshot_xmin = Column(BigInteger, server_default=text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
@@ -0,0 +1,102 @@
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import joinedload
+
+from database import SessionLocal
+from attendance.models import Attendance
+
+logger = logging.getLogger(__name__)
+
+MEMBER_FIELDS = ("first_name", "last_name_paternal", "last_name_maternal", "email", "phone")
+
+
+class OccupancyState:
+    """
+    Sesiones abiertas (miembros dentro del gym) en memoria.
+
+    Se reconstruye desde la base de datos al conectar el bus de eventos y se
+    actualiza con las notificaciones del trigger attendance_notify, que llegan
+    a todos los workers. Mientras el bus esté desconectado ready es False y las
+    rutas deben consultar la base de datos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[int, dict] = {}
+        self.ready = False
+
+    def rebuild(self):
+        db = SessionLocal()
+        try:
+            open_sessions = db.query(Attendance).options(
+                joinedload(Attendance.member)
+            ).filter(Attendance.check_out_time.is_(None)).all()
+            sessions = {a.id: _entry_from_model(a) for a in open_sessions}
+        finally:
+            db.close()
+        with self._lock:
+            self._sessions = sessions
+            self.ready = True
+        logger.info("Ocupación reconstruida: %s sesiones abiertas", len(sessions))
+
+    def invalidate(self):
+        with self._lock:
+            self.ready = False
+
+    def apply(self, event: dict):
+        """Aplicar un evento del canal attendance (idempotente)"""
+        op = event.get("op")
+        with self._lock:
+            if op == "check_in":
+                entry = _entry_from_event(event)
+                self._sessions[entry["id"]] = entry
+            elif op in ("check_out", "auto_checkout", "delete"):
+                self._sessions.pop(event["attendance"]["id"], None)
+
+    def in_gym(self) -> List[dict]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return sorted(sessions, key=lambda s: s["check_in_time"], reverse=True)
+
+    def count(self, on_date: Optional[date] = None) -> int:
+        with self._lock:
+            if on_date is None:
+                return len(self._sessions)
+            return sum(1 for s in self._sessions.values() if s["date"] == on_date)
+
+
+def _entry_from_model(attendance: Attendance) -> dict:
+    return {
+        "id": attendance.id,
+        "member_id": attendance.member_id,
+        "subscription_id": attendance.subscription_id,
+        "check_in_time": attendance.check_in_time,
+        "check_out_time": None,
+        "date": attendance.date,
+        "duration_minutes": None,
+        "notes": attendance.notes,
+        "created_at": attendance.created_at,
+        "member": {field: getattr(attendance.member, field) for field in MEMBER_FIELDS},
+    }
+
+
+def _entry_from_event(event: dict) -> dict:
+    row = event["attendance"]
+    return {
+        "id": row["id"],
+        "member_id": row["member_id"],
+        "subscription_id": row.get("subscription_id"),
+        "check_in_time": datetime.fromisoformat(row["check_in_time"]),
+        "check_out_time": None,
+        "date": date.fromisoformat(row["date"]),
+        "duration_minutes": None,
+        "notes": row.get("notes"),
+        "created_at": datetime.fromisoformat(row["created_at"]) if row.get("created_at") else None,
+        "member": {field: event["member"].get(field) for field in MEMBER_FIELDS},
+    }
+
+
+occupancy = OccupancyState()
@@ -1,19 +1,41 @@
 import jwt
 import os
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 load_dotenv()
 
 QR_SECRET = os.getenv("QR_SECRET", "qr_secret_fuerza_fit_2024")
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "10000"))
+
+# LRU de tokens ya verificados -> member_id (los tokens no expiran)
+_verified_tokens: "OrderedDict[str, int]" = OrderedDict()
+_verified_lock = threading.Lock()
 
 def generate_member_qr_token(member_id: int) -> str:
     payload = {"member_id": member_id, "type": "gym_qr"}
     return jwt.encode(payload, QR_SECRET, algorithm="HS256")
 
-def validate_member_qr_token(token: str) -> int:
+def _decode_member_qr_token(token: str) -> int:
     try:
         payload = jwt.decode(token, QR_SECRET, algorithms=["HS256"])
         if payload.get("type") != "gym_qr":
             raise ValueError("Token inválido")
         return payload["member_id"]
     except jwt.InvalidTokenError:
-        raise ValueError("QR inválido o manipulado")
\ No newline at end of file
+        raise ValueError("QR inválido o manipulado")
+
+def validate_member_qr_token(token: str) -> int:
+    with _verified_lock:
+        member_id = _verified_tokens.get(token)
+        if member_id is not None:
+            _verified_tokens.move_to_end(token)
+            return member_id
+
+    member_id = _decode_member_qr_token(token)
+
+    with _verified_lock:
+        _verified_tokens[token] = member_id
+        if len(_verified_tokens) > QR_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+    return member_id
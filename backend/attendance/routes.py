@@ -1,6 +1,8 @@
 import os
 from attendance.qr_service import generate_member_qr_token, validate_member_qr_token
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from typing import List, Optional
@@ -9,6 +11,20 @@ from zoneinfo import ZoneInfo
 
 from database import get_db
 from attendance.models import Attendance
+from attendance.service import (
+    auto_checkout_expired,
+    check_in_member,
+    toggle_attendance,
+    attendance_from_row,
+    batch_check_in
+)
+from attendance.occupancy import occupancy
+from attendance.stream import broadcaster, load_backlog, sse_events
+from attendance.eligibility import export_eligibility, ELIGIBILITY_SIGNING_KEY
+from attendance.debounce import scan_debouncer
+from attendance.archive import load_archived
+from shared.exceptions import CheckInRejected
+from shared.pagination import keyset_page, next_cursor, NEXT_CURSOR_HEADER
 from members.models import Member
 from subscriptions.models import Subscription
 from attendance.schemas import(
@@ -16,99 +32,77 @@ from attendance.schemas import(
     AttendanceCheckOut,
     AttendanceResponse,
     AttendanceWithMemberResponse,
-    AttendanceStats
+    AttendanceStats,
+    BatchCheckIn,
+    BatchCheckInResponse
 )
 
 MX = ZoneInfo("America/Mexico_City")
 router = APIRouter(prefix="/attendance", tags=["attendance"])
 
-def _auto_checkout_expired(db: Session, hours_limit: int = 4):
-    """Helper: Auto-checkout de sesiones expiradas"""
-    time_limit = datetime.now(MX) - timedelta(hours=hours_limit)
-    
-    expired = db.query(Attendance).filter(
-        and_(
-            Attendance.check_out_time.is_(None),
-            Attendance.check_in_time <= time_limit
-        )
-    ).all()
-    
-    for session in expired:
-        check_in = session.check_in_time
-        if check_in.tzinfo is None:
-            check_in = check_in.replace(tzinfo=MX)
-        session.check_out_time = check_in + timedelta(hours=hours_limit)
-        session.duration_minutes = hours_limit * 60
-        if session.notes:
-            session.notes += f" [Auto-checkout {hours_limit}h]"
-        else:
-            session.notes = f"Auto-checkout {hours_limit}h"
-    
-    if expired:
-        db.commit()
-    
-    return len(expired)
+# Mensajes por motivo de rechazo: (status_code, detalle)
+CHECK_IN_ERRORS = {
+    "member_not_found": (404, "Miembro no encontrado"),
+    "member_inactive": (400, "Miembro no activo"),
+    "no_active_subscription": (400, "El miembro no tiene una suscripción activa. No puede ingresar."),
+    "already_checked_in": (400, "El miembro ya tiene un check-in activo hoy a las {time}"),
+}
+
+QR_CHECK_IN_ERRORS = {
+    "member_not_found": (404, "Miembro no encontrado"),
+    "member_inactive": (400, "Miembro inactivo"),
+    "no_active_subscription": (400, "Sin suscripción activa. No puede ingresar."),
+    "already_checked_in": (400, "Ya tiene entrada activa desde las {time}"),
+}
+
+def _raise_rejection(rejection: CheckInRejected, messages: dict):
+    """Helper: Convertir un CheckInRejected en HTTPException"""
+    status_code, detail = messages[rejection.reason]
+    check_in_time = rejection.open_check_in_time
+    if check_in_time is not None:
+        if check_in_time.tzinfo is not None:
+            check_in_time = check_in_time.astimezone(MX)
+        detail = detail.format(time=check_in_time.strftime('%H:%M'))
+    else:
+        # La sesión concurrente pudo cerrarse antes de leer su hora
+        detail = detail.format(time="--:--")
+    raise HTTPException(status_code=status_code, detail=detail)
+
+def _qr_check_in_body(row) -> dict:
+    """Helper: Respuesta de una entrada por QR"""
+    check_in_local = row.check_in_time.astimezone(MX)
+    return {
+        "success": True,
+        "attendance_id": row.attendance_id,
+        "member_id": row.member_id,
+        "member_name": row.member_name,
+        "check_in_time": check_in_local.strftime("%H:%M"),
+        "subscription": {
+            "plan_name": row.plan_name or "Plan",
+            "end_date": row.end_date.strftime("%d/%m/%Y"),
+            "days_remaining": row.days_remaining,
+            "alert": "warning" if row.days_remaining <= 5 else "ok"
+        }
+    }
 
 # ── POST routes ────────────────────────────────────────────────
 
 @router.post("/check-in", response_model=AttendanceResponse, status_code=status.HTTP_201_CREATED)
 def check_in(attendance: AttendanceCheckIn, db: Session = Depends(get_db)):
     """Registrar entrada de un miembro"""
-    _auto_checkout_expired(db, hours_limit=4)
-    
-    member = db.query(Member).filter(Member.id == attendance.member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Miembro no encontrado")
-    if not member.is_active:
-        raise HTTPException(status_code=400, detail="Miembro no activo")
-    
-    active_subscription = db.query(Subscription).filter(
-        and_(
-            Subscription.member_id == attendance.member_id,
-            Subscription.status == "active",
-            Subscription.end_date >= date.today()
-        )
-    ).first()
-    
-    if not active_subscription:
-        raise HTTPException(
-            status_code=400,
-            detail="El miembro no tiene una suscripción activa. No puede ingresar."
-        )
-    
-    today = date.today()
-    existing_checkin = db.query(Attendance).filter(
-        and_(
-            Attendance.member_id == attendance.member_id,
-            Attendance.date == today,
-            Attendance.check_out_time.is_(None)
-        )
-    ).first()
-    
-    if existing_checkin:
-        check_in_local = existing_checkin.check_in_time
-        if check_in_local.tzinfo is not None:
-            check_in_local = check_in_local.astimezone(MX)
-        raise HTTPException(
-            status_code=400,
-            detail=f"El miembro ya tiene un check-in activo hoy a las {check_in_local.strftime('%H:%M')}"
-        )
-    
-    db_attendance = Attendance(
-        member_id=attendance.member_id,
-        subscription_id=active_subscription.id,
-        notes=attendance.notes
-    )
-    db.add(db_attendance)
+    try:
+        row = check_in_member(db, attendance.member_id, notes=attendance.notes)
+    except CheckInRejected as e:
+        _raise_rejection(e, CHECK_IN_ERRORS)
     db.commit()
-    db.refresh(db_attendance)
-    return db_attendance
+    return attendance_from_row(row)
 
 
 @router.post("/auto-checkout", status_code=status.HTTP_200_OK)
 def manual_auto_checkout(db: Session = Depends(get_db)):
     """Ejecutar auto-checkout manualmente"""
-    count = _auto_checkout_expired(db, hours_limit=4)
+    count = len(auto_checkout_expired(db))
+    db.commit()
     return {"message": "Auto-checkout ejecutado", "sessions_closed": count}
 
 
@@ -119,78 +113,139 @@ def qr_checkin(token: str, db: Session = Depends(get_db)):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    member = db.query(Member).filter(Member.id == member_id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="Miembro no encontrado")
-    if not member.is_active:
-        raise HTTPException(status_code=400, detail="Miembro inactivo")
+    # Lecturas repetidas del mismo QR: misma respuesta que el primer escaneo
+    scan_key = ("qr-checkin", member_id)
+    cached = scan_debouncer.lookup(scan_key)
+    if cached is not None:
+        status_code, body = cached
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=body)
+        return body
 
-    active_subscription = db.query(Subscription).filter(
-        and_(
-            Subscription.member_id == member_id,
-            Subscription.status == "active",
-            Subscription.end_date >= date.today()
-        )
-    ).first()
-
-    if not active_subscription:
-        raise HTTPException(status_code=400, detail="Sin suscripción activa. No puede ingresar.")
+    try:
+        row = check_in_member(db, member_id, notes="Check-in por QR")
+    except CheckInRejected as e:
+        try:
+            _raise_rejection(e, QR_CHECK_IN_ERRORS)
+        except HTTPException as rejection:
+            scan_debouncer.remember(scan_key, rejection.status_code, rejection.detail)
+            raise
+
+    body = _qr_check_in_body(row)
+    scan_debouncer.share(db, scan_key, 200, body)
+    db.commit()
+    scan_debouncer.remember(scan_key, 200, body)
+    return body
 
-    _auto_checkout_expired(db, hours_limit=4)
 
-    today = date.today()
-    existing = db.query(Attendance).filter(
-        and_(
-            Attendance.member_id == member_id,
-            Attendance.date == today,
-            Attendance.check_out_time.is_(None)
-        )
-    ).first()
+@router.post("/qr-scan")
+def qr_scan(token: str, db: Session = Depends(get_db)):
+    """Escaneo en torniquete: entrada si el miembro está fuera, salida si está dentro"""
+    try:
+        member_id = validate_member_qr_token(token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if existing:
-        check_in_local = existing.check_in_time.astimezone(MX)
-        raise HTTPException(
-            status_code=400,
-            detail=f"Ya tiene entrada activa desde las {check_in_local.strftime('%H:%M')}"
-        )
+    # Sin debounce una lectura doble registraría entrada y salida
+    scan_key = ("qr-scan", member_id)
+    cached = scan_debouncer.lookup(scan_key)
+    if cached is not None:
+        status_code, body = cached
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=body)
+        return body
 
-    db_attendance = Attendance(
-        member_id=member_id,
-        subscription_id=active_subscription.id,
-        notes="Check-in por QR"
-    )
-    db.add(db_attendance)
+    try:
+        action, row = toggle_attendance(db, member_id, notes="Check-in por QR")
+    except CheckInRejected as e:
+        try:
+            _raise_rejection(e, QR_CHECK_IN_ERRORS)
+        except HTTPException as rejection:
+            scan_debouncer.remember(scan_key, rejection.status_code, rejection.detail)
+            raise
+
+    if action == "check_in":
+        body = dict(_qr_check_in_body(row), action="check_in")
+    else:
+        body = {
+            "success": True,
+            "action": "check_out",
+            "attendance_id": row.closed_attendance_id,
+            "member_id": member_id,
+            "member_name": row.member_name,
+            "check_in_time": row.closed_check_in_time.astimezone(MX).strftime("%H:%M"),
+            "check_out_time": row.closed_check_out_time.astimezone(MX).strftime("%H:%M"),
+            "duration_minutes": row.closed_duration_minutes
+        }
+    scan_debouncer.share(db, scan_key, 200, body)
     db.commit()
-    db.refresh(db_attendance)
+    scan_debouncer.remember(scan_key, 200, body)
+    return body
 
-    days_remaining = (active_subscription.end_date - today).days
-    check_in_local = db_attendance.check_in_time.astimezone(MX)
 
-    return {
-        "success": True,
-        "attendance_id": db_attendance.id,
-        "member_id": member_id,
-        "member_name": f"{member.first_name} {member.last_name_paternal}"
-                        + (f" {member.last_name_maternal}" if member.last_name_maternal else ""),
-        "check_in_time": check_in_local.strftime("%H:%M"),
-        "subscription": {
-            "plan_name": active_subscription.plan.name if active_subscription.plan else "Plan",
-            "end_date": active_subscription.end_date.strftime("%d/%m/%Y"),
-            "days_remaining": days_remaining,
-            "alert": "warning" if days_remaining <= 5 else "ok"
-        }
-    }
+@router.post("/batch-checkin", response_model=BatchCheckInResponse)
+def batch_checkin(batch: BatchCheckIn, db: Session = Depends(get_db)):
+    """Registrar entradas escaneadas sin conexión con su hora original"""
+    results = batch_check_in(db, batch.scans)
+    db.commit()
+    statuses = [r["status"] for r in results]
+    return BatchCheckInResponse(
+        accepted=statuses.count("accepted"),
+        duplicates=statuses.count("duplicate"),
+        rejected=statuses.count("rejected"),
+        results=results
+    )
 
 # ── GET routes sin parámetros dinámicos ───────────────────────
 
+@router.get("/events/stream")
+async def stream_attendance_events(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="Reanudar después de este evento")
+):
+    """
+    Entradas y salidas en tiempo real (Server-Sent Events).
+
+    Eventos: check_in, check_out, auto_checkout, delete y reset (recargar la
+    lista completa). Para no perder eventos, abrir el stream antes de cargar
+    la lista; al reconectar se reanuda con el header Last-Event-ID o el
+    parámetro last_event_id. Al reanudar se pueden repetir eventos ya
+    recibidos (los de transacciones que confirmaron fuera de orden); el
+    cliente debe descartarlos por event_id.
+    """
+    if last_event_id is None:
+        header_id = request.headers.get("last-event-id", "")
+        if header_id.isdigit():
+            last_event_id = int(header_id)
+
+    subscriber = broadcaster.subscribe()
+    backlog, reset = [], False
+    if last_event_id is not None:
+        backlog, reset = await run_in_threadpool(load_backlog, last_event_id)
+
+    return StreamingResponse(
+        sse_events(request, subscriber, backlog, reset),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/scans/debounce-stats")
+def get_scan_debounce_stats():
+    """Lecturas QR duplicadas absorbidas por el debouncer de este worker"""
+    return scan_debouncer.stats()
+
+
 @router.get("/", response_model=List[AttendanceResponse])
 def get_attendances(
+    response: Response,
     member_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     only_active: bool = False,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Header X-Next-Cursor de la página anterior (en lugar de skip)"),
     db: Session = Depends(get_db)
 ):
     """Listar asistencias con filtros opcionales"""
@@ -203,13 +258,18 @@ def get_attendances(
         query = query.filter(Attendance.date <= end_date)
     if only_active:
         query = query.filter(Attendance.check_out_time.is_(None))
-    attendances = query.order_by(Attendance.check_in_time.desc()).offset(skip).limit(limit).all()
+    attendances = keyset_page(query, Attendance.check_in_time, Attendance.id, cursor, limit, skip=skip).all()
+    cursor_value = next_cursor(attendances, limit, "check_in_time")
+    if cursor_value:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
     return attendances
 
 
 @router.get("/current/in-gym", response_model=List[AttendanceWithMemberResponse])
 def get_current_members_in_gym(db: Session = Depends(get_db)):
     """Obtener lista de miembros actualmente en el gym (sin check-out)"""
+    if occupancy.ready:
+        return occupancy.in_gym()
     attendances = db.query(Attendance).filter(
         Attendance.check_out_time.is_(None)
     ).order_by(Attendance.check_in_time.desc()).all()
@@ -231,12 +291,15 @@ def get_daily_stats(
         avg_duration = sum(a.duration_minutes for a in completed_visits) / len(completed_visits)
     current_in_gym = 0
     if target_date == date.today():
-        current_in_gym = db.query(Attendance).filter(
-            and_(
-                Attendance.date == target_date,
-                Attendance.check_out_time.is_(None)
-            )
-        ).count()
+        if occupancy.ready:
+            current_in_gym = occupancy.count(on_date=target_date)
+        else:
+            current_in_gym = db.query(Attendance).filter(
+                and_(
+                    Attendance.date == target_date,
+                    Attendance.check_out_time.is_(None)
+                )
+            ).count()
     return AttendanceStats(
         total_visits=total_visits,
         unique_members=unique_members,
@@ -245,6 +308,17 @@ def get_daily_stats(
     )
 
 
+@router.get("/eligibility/snapshot")
+def get_eligibility_snapshot(
+    since: Optional[int] = Query(None, ge=0, description="Versión del último snapshot recibido"),
+    db: Session = Depends(get_db)
+):
+    """Snapshot firmado (HMAC-SHA256) de miembros elegibles para validar QR en el kiosco"""
+    if not ELIGIBILITY_SIGNING_KEY:
+        raise HTTPException(status_code=503, detail="Exportación de elegibilidad no configurada")
+    return export_eligibility(db, since=since)
+
+
 @router.get("/member/{member_id}/history", response_model=List[AttendanceResponse])
 def get_member_attendance_history(
     member_id: int,
@@ -262,7 +336,10 @@ def get_member_attendance_history(
             Attendance.date >= start_date
         )
     ).order_by(Attendance.date.desc()).all()
-    return attendances
+    # Los meses archivados son anteriores a todo lo que sigue en la tabla
+    archived = load_archived(db, start_date, member_id=member_id)
+    archived.sort(key=lambda a: a["date"], reverse=True)
+    return attendances + archived
 
 
 @router.get("/member/{member_id}/qr-token")
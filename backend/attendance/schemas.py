@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 
 #Base schema
 class AttendanceBase(BaseModel):
@@ -51,4 +51,26 @@ class AttendanceStats(BaseModel):
     total_visits: int
     unique_members: int
     average_duration_minutes: Optional[float] = None
-    current_members_in_gym: int
\ No newline at end of file
+    current_members_in_gym: int
+
+
+# Schemas for offline batch check-in
+class OfflineScan(BaseModel):
+    token: str
+    scanned_at: datetime
+
+class BatchCheckIn(BaseModel):
+    scans: List[OfflineScan] = Field(..., min_length=1, max_length=1000)
+
+class BatchCheckInResult(BaseModel):
+    index: int
+    status: str  # "accepted", "duplicate", "rejected"
+    member_id: Optional[int] = None
+    attendance_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BatchCheckInResponse(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: int
+    results: List[BatchCheckInResult]
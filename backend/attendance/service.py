@@ -0,0 +1,430 @@
+import os
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, update, func, text, Text
+from sqlalchemy.orm import Session
+
+from attendance.models import Attendance
+from attendance.eligibility import eligibility, EligibilitySnapshot
+from attendance.qr_service import validate_member_qr_token
+from shared.exceptions import CheckInRejected
+
+MX = ZoneInfo("America/Mexico_City")
+
+AUTO_CHECKOUT_HOURS = int(os.getenv("AUTO_CHECKOUT_HOURS", "4"))
+AUTO_CHECKOUT_INTERVAL_SECONDS = int(os.getenv("AUTO_CHECKOUT_INTERVAL_SECONDS", "60"))
+
+
+def auto_checkout_expired(db: Session, hours_limit: int = AUTO_CHECKOUT_HOURS):
+    """Cerrar en un solo UPDATE las sesiones abiertas por más de hours_limit horas.
+
+    No hace commit; regresa las filas cerradas (id, member_id).
+    """
+    time_limit = datetime.now(MX) - timedelta(hours=hours_limit)
+    tag = f"Auto-checkout {hours_limit}h"
+
+    # El trigger attendance_notify publica estas salidas como auto_checkout
+    db.execute(text("SET LOCAL app.checkout_kind = 'auto'"))
+
+    stmt = (
+        update(Attendance)
+        .where(
+            Attendance.check_out_time.is_(None),
+            Attendance.check_in_time <= time_limit
+        )
+        .values(
+            check_out_time=Attendance.check_in_time + timedelta(hours=hours_limit),
+            duration_minutes=hours_limit * 60,
+            notes=func.coalesce(func.nullif(Attendance.notes, "", type_=Text) + f" [{tag}]", tag)
+        )
+        .returning(Attendance.id, Attendance.member_id)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).all()
+
+
+def auto_checkout_job(db: Session) -> int:
+    """Tarea del scheduler"""
+    return len(auto_checkout_expired(db))
+
+
+class CheckInResult(NamedTuple):
+    member_id: int
+    is_active: bool
+    member_name: str
+    active_subscription_id: int
+    end_date: date
+    plan_name: Optional[str]
+    days_remaining: int
+    attendance_id: int
+    subscription_id: int
+    check_in_time: datetime
+    check_out_time: Optional[datetime]
+    date: date
+    duration_minutes: Optional[int]
+    notes: Optional[str]
+    created_at: datetime
+
+
+# Miembro y su suscripción vigente, compartidos por CHECK_IN_SQL y SCAN_TOGGLE_SQL
+MEMBER_ELIGIBILITY_CTES = """
+    m AS (
+        SELECT id, is_active,
+               concat_ws(' ', first_name, last_name_paternal, NULLIF(last_name_maternal, '')) AS member_name
+        FROM members
+        WHERE id = :member_id
+    ),
+    s AS (
+        SELECT sub.id, sub.end_date, p.name AS plan_name
+        FROM subscriptions sub
+        JOIN plans p ON p.id = sub.plan_id
+        WHERE sub.member_id = :member_id
+          AND sub.status = 'active'
+          AND sub.end_date >= :today
+        ORDER BY sub.end_date DESC
+        LIMIT 1
+    )"""
+
+# Validación e inserción en un solo viaje a la base de datos.
+# La entrada duplicada la rechaza el índice único parcial uq_attendance_open_member
+# (ON CONFLICT). Como el índice es por día, open_session cubre la sesión que
+# sigue abierta desde el día anterior.
+CHECK_IN_SQL = text(f"""
+    WITH {MEMBER_ELIGIBILITY_CTES},
+    open_session AS (
+        SELECT 1 FROM attendance
+        WHERE member_id = :member_id AND check_out_time IS NULL
+    ),
+    ins AS (
+        INSERT INTO attendance (member_id, subscription_id, notes)
+        SELECT m.id, s.id, :notes
+        FROM m JOIN s ON true
+        WHERE m.is_active
+          AND NOT EXISTS (SELECT 1 FROM open_session)
+        ON CONFLICT (member_id, date) WHERE check_out_time IS NULL DO NOTHING
+        RETURNING id, subscription_id, check_in_time, check_out_time, date,
+                  duration_minutes, notes, created_at
+    )
+    SELECT m.id AS member_id, m.is_active, m.member_name,
+           s.id AS active_subscription_id, s.end_date, s.plan_name,
+           ins.id AS attendance_id, ins.subscription_id, ins.check_in_time,
+           ins.check_out_time, ins.date, ins.duration_minutes, ins.notes, ins.created_at
+    FROM m
+    LEFT JOIN s ON true
+    LEFT JOIN ins ON true
+""")
+
+# Con la elegibilidad en caché sólo falta el INSERT
+INSERT_ATTENDANCE_SQL = text("""
+    INSERT INTO attendance (member_id, subscription_id, notes)
+    SELECT :member_id, :subscription_id, :notes
+    WHERE NOT EXISTS (
+        SELECT 1 FROM attendance
+        WHERE member_id = :member_id AND check_out_time IS NULL
+    )
+    ON CONFLICT (member_id, date) WHERE check_out_time IS NULL DO NOTHING
+    RETURNING id, subscription_id, check_in_time, check_out_time, date,
+              duration_minutes, notes, created_at
+""")
+
+ATTENDANCE_FIELDS = ("subscription_id", "check_in_time", "check_out_time", "date",
+                     "duration_minutes", "notes", "created_at")
+
+
+def check_in_member(db: Session, member_id: int, notes: Optional[str] = None, today: Optional[date] = None) -> CheckInResult:
+    """Validar y registrar la entrada de un miembro con una sola sentencia.
+
+    Si la elegibilidad del miembro está en caché sólo se ejecuta el INSERT.
+    No hace commit. Lanza CheckInRejected si no procede.
+    """
+    today = today or date.today()
+    snapshot = eligibility.get(member_id)
+
+    if snapshot is None:
+        generation = eligibility.generation()
+        row = db.execute(CHECK_IN_SQL, {"member_id": member_id, "today": today, "notes": notes}).first()
+        if row is None:
+            raise CheckInRejected("member_not_found")
+        snapshot = EligibilitySnapshot(
+            member_id=member_id,
+            is_active=row.is_active,
+            member_name=row.member_name,
+            subscription_id=row.active_subscription_id,
+            end_date=row.end_date,
+            plan_name=row.plan_name
+        )
+        eligibility.put(snapshot, generation)
+        inserted = row if row.attendance_id is not None else None
+        attendance_id = row.attendance_id
+    else:
+        inserted = None
+        attendance_id = None
+        if snapshot.is_eligible(today):
+            inserted = db.execute(INSERT_ATTENDANCE_SQL, {
+                "member_id": member_id,
+                "subscription_id": snapshot.subscription_id,
+                "notes": notes
+            }).first()
+            attendance_id = inserted.id if inserted is not None else None
+
+    _validate_check_in(db, snapshot, inserted, today)
+
+    return CheckInResult(
+        member_id=member_id,
+        is_active=snapshot.is_active,
+        member_name=snapshot.member_name,
+        active_subscription_id=snapshot.subscription_id,
+        end_date=snapshot.end_date,
+        plan_name=snapshot.plan_name,
+        days_remaining=(snapshot.end_date - today).days,
+        attendance_id=attendance_id,
+        **{field: getattr(inserted, field) for field in ATTENDANCE_FIELDS}
+    )
+
+
+def _validate_check_in(db: Session, snapshot: EligibilitySnapshot, inserted, today: date):
+    """Helper: Lanzar CheckInRejected si la entrada no se registró"""
+    if not snapshot.is_active:
+        raise CheckInRejected("member_inactive")
+    if snapshot.subscription_id is None or snapshot.end_date < today:
+        raise CheckInRejected("no_active_subscription")
+    if inserted is None:
+        # Sólo en el rechazo se consulta la hora de la sesión abierta
+        open_check_in_time = db.execute(
+            select(Attendance.check_in_time).where(
+                Attendance.member_id == snapshot.member_id,
+                Attendance.check_out_time.is_(None)
+            )
+        ).scalar()
+        raise CheckInRejected("already_checked_in", open_check_in_time=open_check_in_time)
+
+
+# Escaneo en torniquete: cierra la sesión abierta del miembro o, si no
+# tiene, registra su entrada. Todo en una sola sentencia.
+SCAN_TOGGLE_SQL = text(f"""
+    WITH closed AS (
+        UPDATE attendance
+        SET check_out_time = now(),
+            duration_minutes = floor(extract(epoch FROM now() - check_in_time) / 60)::int
+        WHERE member_id = :member_id
+          AND check_out_time IS NULL
+        RETURNING id, check_in_time, check_out_time, duration_minutes
+    ),
+    {MEMBER_ELIGIBILITY_CTES},
+    ins AS (
+        INSERT INTO attendance (member_id, subscription_id, notes)
+        SELECT m.id, s.id, :notes
+        FROM m JOIN s ON true
+        WHERE m.is_active
+          AND NOT EXISTS (SELECT 1 FROM closed)
+        ON CONFLICT (member_id, date) WHERE check_out_time IS NULL DO NOTHING
+        RETURNING id, subscription_id, check_in_time, check_out_time, date,
+                  duration_minutes, notes, created_at
+    )
+    SELECT m.id AS member_id, m.is_active, m.member_name,
+           s.id AS active_subscription_id, s.end_date, s.plan_name,
+           ins.id AS attendance_id, ins.subscription_id, ins.check_in_time,
+           ins.check_out_time, ins.date, ins.duration_minutes, ins.notes, ins.created_at,
+           closed.id AS closed_attendance_id, closed.check_in_time AS closed_check_in_time,
+           closed.check_out_time AS closed_check_out_time,
+           closed.duration_minutes AS closed_duration_minutes
+    FROM m
+    LEFT JOIN s ON true
+    LEFT JOIN ins ON true
+    LEFT JOIN closed ON true
+""")
+
+
+def toggle_attendance(db: Session, member_id: int, notes: Optional[str] = None, today: Optional[date] = None):
+    """Registrar la salida del miembro si está dentro; si no, su entrada.
+
+    Regresa ("check_out", fila) o ("check_in", CheckInResult). No hace commit.
+    Lanza CheckInRejected si la entrada no procede.
+    """
+    today = today or date.today()
+    generation = eligibility.generation()
+    row = db.execute(SCAN_TOGGLE_SQL, {"member_id": member_id, "today": today, "notes": notes}).first()
+    if row is None:
+        raise CheckInRejected("member_not_found")
+
+    snapshot = EligibilitySnapshot(
+        member_id=member_id,
+        is_active=row.is_active,
+        member_name=row.member_name,
+        subscription_id=row.active_subscription_id,
+        end_date=row.end_date,
+        plan_name=row.plan_name
+    )
+    eligibility.put(snapshot, generation)
+
+    if row.closed_attendance_id is not None:
+        return "check_out", row
+
+    inserted = row if row.attendance_id is not None else None
+    _validate_check_in(db, snapshot, inserted, today)
+    return "check_in", CheckInResult(
+        member_id=member_id,
+        is_active=row.is_active,
+        member_name=row.member_name,
+        active_subscription_id=row.active_subscription_id,
+        end_date=row.end_date,
+        plan_name=row.plan_name,
+        days_remaining=(row.end_date - today).days,
+        attendance_id=row.attendance_id,
+        **{field: getattr(row, field) for field in ATTENDANCE_FIELDS}
+    )
+
+
+def attendance_from_row(row: CheckInResult) -> dict:
+    """Campos de AttendanceResponse a partir del resultado de check_in_member"""
+    return {
+        "id": row.attendance_id,
+        "member_id": row.member_id,
+        "subscription_id": row.subscription_id,
+        "check_in_time": row.check_in_time,
+        "check_out_time": row.check_out_time,
+        "date": row.date,
+        "duration_minutes": row.duration_minutes,
+        "notes": row.notes,
+        "created_at": row.created_at,
+    }
+
+
+# ── Check-in offline por lotes ────────────────────────────────
+
+BATCH_VALIDATE_SQL = text("""
+    SELECT s.idx,
+           m.id IS NOT NULL AS member_exists,
+           COALESCE(m.is_active, false) AS is_active,
+           sub.id AS subscription_id,
+           EXISTS (
+               SELECT 1 FROM attendance a
+               WHERE a.member_id = s.member_id
+                 AND a.check_in_time > s.scanned_at - make_interval(hours => :hours)
+                 AND a.check_in_time < s.scanned_at + make_interval(hours => :hours)
+           ) AS already_recorded
+    FROM unnest(CAST(:idx AS int[]), CAST(:member_ids AS int[]), CAST(:scanned_at AS timestamptz[]))
+         AS s(idx, member_id, scanned_at)
+    LEFT JOIN members m ON m.id = s.member_id
+    LEFT JOIN LATERAL (
+        SELECT sub.id
+        FROM subscriptions sub
+        WHERE sub.member_id = s.member_id
+          AND sub.status <> 'cancelled'
+          AND sub.start_date <= (s.scanned_at AT TIME ZONE 'America/Mexico_City')::date
+          AND sub.end_date >= (s.scanned_at AT TIME ZONE 'America/Mexico_City')::date
+        ORDER BY sub.end_date DESC
+        LIMIT 1
+    ) sub ON true
+""")
+
+# Las entradas más viejas que el límite de auto-checkout se guardan ya cerradas
+BATCH_INSERT_SQL = text("""
+    INSERT INTO attendance (member_id, subscription_id, check_in_time, check_out_time,
+                            date, duration_minutes, notes)
+    SELECT r.member_id, r.subscription_id, r.scanned_at,
+           CASE WHEN r.expired THEN r.scanned_at + make_interval(hours => :hours) END,
+           (r.scanned_at AT TIME ZONE 'America/Mexico_City')::date,
+           CASE WHEN r.expired THEN :hours * 60 END,
+           CASE WHEN r.expired THEN :closed_note ELSE :open_note END
+    FROM (
+        SELECT u.*, u.scanned_at <= now() - make_interval(hours => :hours) AS expired
+        FROM unnest(CAST(:member_ids AS int[]), CAST(:subscription_ids AS int[]),
+                    CAST(:scanned_at AS timestamptz[]))
+             AS u(member_id, subscription_id, scanned_at)
+    ) r
+    WHERE r.expired OR NOT EXISTS (
+        SELECT 1 FROM attendance a
+        WHERE a.member_id = r.member_id AND a.check_out_time IS NULL
+    )
+    ON CONFLICT (member_id, date) WHERE check_out_time IS NULL DO NOTHING
+    RETURNING id, member_id, check_in_time
+""")
+
+
+def batch_check_in(db: Session, scans: list, hours_limit: int = AUTO_CHECKOUT_HOURS) -> List[dict]:
+    """Registrar entradas escaneadas sin conexión, con su hora original.
+
+    Valida todo el lote con una consulta y lo inserta con otra. Un mismo
+    miembro escaneado varias veces dentro de hours_limit cuenta una sola vez.
+    No hace commit. Regresa un resultado por escaneo, en el orden recibido.
+    """
+    results = [{"index": i, "status": "rejected"} for i in range(len(scans))]
+    now = datetime.now(MX)
+
+    candidates = []
+    for i, scan in enumerate(scans):
+        try:
+            member_id = validate_member_qr_token(scan.token)
+        except ValueError as e:
+            results[i]["detail"] = str(e)
+            continue
+        scanned_at = scan.scanned_at if scan.scanned_at.tzinfo else scan.scanned_at.replace(tzinfo=MX)
+        results[i]["member_id"] = member_id
+        if scanned_at > now + timedelta(minutes=5):
+            results[i]["detail"] = "Fecha de escaneo en el futuro"
+            continue
+        candidates.append((member_id, scanned_at, i))
+
+    # Lecturas repetidas del mismo miembro dentro del lote
+    window = timedelta(hours=hours_limit)
+    unique = []
+    last_by_member = {}
+    for member_id, scanned_at, i in sorted(candidates):
+        previous = last_by_member.get(member_id)
+        if previous is not None and scanned_at - previous < window:
+            results[i].update(status="duplicate", detail="Entrada duplicada")
+            continue
+        last_by_member[member_id] = scanned_at
+        unique.append((member_id, scanned_at, i))
+
+    if not unique:
+        return results
+
+    checks = db.execute(BATCH_VALIDATE_SQL, {
+        "idx": [i for _, _, i in unique],
+        "member_ids": [member_id for member_id, _, _ in unique],
+        "scanned_at": [scanned_at for _, scanned_at, _ in unique],
+        "hours": hours_limit
+    }).all()
+
+    accepted = []
+    scanned = {i: (member_id, scanned_at) for member_id, scanned_at, i in unique}
+    for check in checks:
+        result = results[check.idx]
+        if not check.member_exists:
+            result["detail"] = "Miembro no encontrado"
+        elif not check.is_active:
+            result["detail"] = "Miembro inactivo"
+        elif check.subscription_id is None:
+            result["detail"] = "Sin suscripción activa. No puede ingresar."
+        elif check.already_recorded:
+            result.update(status="duplicate", detail="Entrada ya registrada")
+        else:
+            member_id, scanned_at = scanned[check.idx]
+            accepted.append((member_id, check.subscription_id, scanned_at, check.idx))
+
+    if not accepted:
+        return results
+
+    inserted = db.execute(BATCH_INSERT_SQL, {
+        "member_ids": [a[0] for a in accepted],
+        "subscription_ids": [a[1] for a in accepted],
+        "scanned_at": [a[2] for a in accepted],
+        "hours": hours_limit,
+        "open_note": "Check-in por QR (offline)",
+        "closed_note": f"Check-in por QR (offline) [Auto-checkout {hours_limit}h]"
+    }).all()
+    attendance_ids = {(row.member_id, row.check_in_time): row.id for row in inserted}
+
+    for member_id, _, scanned_at, i in accepted:
+        attendance_id = attendance_ids.get((member_id, scanned_at))
+        if attendance_id is None:
+            # Chocó con una sesión abierta registrada en línea
+            results[i].update(status="duplicate", detail="Ya tiene entrada activa")
+        else:
+            results[i].update(status="accepted", attendance_id=attendance_id)
+
+    return results
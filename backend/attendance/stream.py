@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from attendance.models import AttendanceEvent
+
+EVENT_RETENTION_HOURS = int(os.getenv("ATTENDANCE_EVENT_RETENTION_HOURS", "48"))
+HEARTBEAT_SECONDS = 15
+QUEUE_SIZE = 500
+EVENTS_PAGE_SIZE = 1000
+MAX_BACKLOG = 5000
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente demasiado lento: se le pide recargar en vez de perder eventos en silencio
+            self.overflowed = True
+
+
+class EventBroadcaster:
+    """
+    Reparte los eventos del canal attendance a los clientes SSE de este worker.
+
+    Lleva el último event_id recibido para que, si el bus se reconecta, se
+    reenvíen desde la tabla attendance_events los eventos perdidos mientras
+    estuvo caído.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscriber] = set()
+        self.last_event_id: Optional[int] = None
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event: dict):
+        """Handler del bus (corre en el hilo del listener)"""
+        event_id = event.get("event_id")
+        if event_id is not None and (self.last_event_id is None or event_id > self.last_event_id):
+            self.last_event_id = event_id
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.push, event)
+
+    def catch_up(self):
+        """Handler on_connect del bus: reenviar lo ocurrido mientras estuvo desconectado.
+
+        Puede repetir eventos ya entregados (ver resume_window); sse_events
+        los descarta por event_id.
+        """
+        db = SessionLocal()
+        try:
+            if self.last_event_id is None:
+                self.last_event_id = db.query(func.max(AttendanceEvent.id)).scalar() or 0
+                return
+            for event in resume_window(db, self.last_event_id):
+                self.publish(event)
+            while True:
+                events = events_since(db, self.last_event_id)
+                for event in events:
+                    self.publish(event)
+                if len(events) < EVENTS_PAGE_SIZE:
+                    break
+        finally:
+            db.close()
+
+
+def events_since(db: Session, last_event_id: int, limit: int = EVENTS_PAGE_SIZE) -> List[dict]:
+    rows = db.query(AttendanceEvent).filter(
+        AttendanceEvent.id > last_event_id
+    ).order_by(AttendanceEvent.id.asc()).limit(limit).all()
+    return [dict(row.payload, event_id=row.id) for row in rows]
+
+
+def resume_window(db: Session, last_event_id: int) -> List[dict]:
+    """Eventos con id menor que last_event_id que pudieron confirmarse después.
+
+    Los ids se asignan al insertar, no al hacer commit: un evento de id menor
+    cuya transacción seguía abierta cuando se insertó last_event_id llega
+    después que él. Esas transacciones tienen txid >= snapshot_xmin del
+    evento last_event_id, así que se reenvían; el cliente descarta por
+    event_id los que ya tenía.
+    """
+    anchor = db.query(AttendanceEvent.snapshot_xmin).filter(AttendanceEvent.id == last_event_id).scalar()
+    if anchor is None:
+        return []
+    rows = db.query(AttendanceEvent).filter(
+        AttendanceEvent.id < last_event_id,
+        AttendanceEvent.txid >= anchor
+    ).order_by(AttendanceEvent.id.asc()).limit(EVENTS_PAGE_SIZE).all()
+    return [dict(row.payload, event_id=row.id) for row in rows]
+
+
+def resume_is_possible(db: Session, last_event_id: int) -> bool:
+    """False si los eventos posteriores a last_event_id ya fueron depurados"""
+    oldest = db.query(func.min(AttendanceEvent.id)).scalar()
+    return oldest is None or oldest <= last_event_id + 1
+
+
+def load_backlog(last_event_id: int) -> Tuple[List[dict], bool]:
+    """Eventos posteriores a last_event_id. Regresa (eventos, reset); con reset
+    el cliente debe recargar la lista completa en lugar de aplicar deltas."""
+    db = SessionLocal()
+    try:
+        if not resume_is_possible(db, last_event_id):
+            return [], True
+        backlog: List[dict] = resume_window(db, last_event_id)
+        cursor = last_event_id
+        while True:
+            events = events_since(db, cursor)
+            if events:
+                cursor = events[-1]["event_id"]
+            backlog.extend(events)
+            if len(backlog) > MAX_BACKLOG:
+                return [], True
+            if len(events) < EVENTS_PAGE_SIZE:
+                return backlog, False
+    finally:
+        db.close()
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['event_id']}\nevent: {event['op']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+RESET_MESSAGE = "event: reset\ndata: {}\n\n"
+
+
+async def sse_events(request, subscriber: Subscriber, backlog: List[dict], reset: bool):
+    """Generador SSE: backlog del resume, luego eventos en vivo y heartbeats"""
+    sent_ids = deque(maxlen=QUEUE_SIZE + MAX_BACKLOG)
+    try:
+        if reset:
+            yield RESET_MESSAGE
+        for event in backlog:
+            sent_ids.append(event["event_id"])
+            yield format_sse(event)
+        while not await request.is_disconnected():
+            if subscriber.overflowed:
+                yield RESET_MESSAGE
+                break
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            event_id = event.get("event_id")
+            if event_id is None or event_id in sent_ids:
+                continue
+            sent_ids.append(event_id)
+            yield format_sse(event)
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+
+def prune_events_job(db: Session) -> int:
+    """Tarea del scheduler: depurar eventos viejos"""
+    cutoff = datetime.now().astimezone() - timedelta(hours=EVENT_RETENTION_HOURS)
+    result = db.execute(
+        delete(AttendanceEvent).where(AttendanceEvent.created_at < cutoff)
+    )
+    return result.rowcount
+
+
+broadcaster = EventBroadcaster()
@@ -0,0 +1,117 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, Tuple
+
+from sqlalchemy.orm import Session
+
+from shared.events import publish
+
+# Section -> (TTL in seconds, write topics that invalidate it).
+# The TTL also covers what no write announces, like the date rolling over.
+SECTION_POLICIES: Dict[str, Tuple[float, frozenset]] = {
+    "counts": (60, frozenset({"attendance", "members", "subscriptions"})),
+    "payment_metrics": (300, frozenset({"payments", "subscriptions"})),
+    "expiring_subscriptions": (600, frozenset({"subscriptions", "members", "plans"})),
+    "recent_checkins": (60, frozenset({"attendance", "members", "subscriptions"})),
+    "recent_payments": (300, frozenset({"payments", "members"})),
+    "weekly_stats": (600, frozenset({"attendance", "members"})),
+    "weekly_income": (600, frozenset({"payments"})),
+    "plan_metrics": (600, frozenset({"subscriptions", "plans"})),
+    "upcoming_birthdays": (3600, frozenset({"members"})),
+}
+
+
+class DashboardCache:
+    """
+    Dashboard sections already computed, per section and parameters.
+
+    Concurrent requests for the same section share one computation. Writes
+    invalidate through the bus ("attendance", "members" and "plans" come from
+    their own paths; payments and subscriptions publish on "dashboard"), so
+    while the bus is disconnected nothing is stored.
+    """
+
+    def __init__(self, policies: Dict[str, Tuple[float, frozenset]] = SECTION_POLICIES):
+        self.policies = policies
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, Tuple[float, dict]] = {}
+        self._inflight: Dict[tuple, Future] = {}
+        # Bumped on invalidation so a computation that started before the
+        # write does not store its (stale) result
+        self._generations: Dict[str, int] = {}
+        self.ready = False
+
+    def get(self, name: str, params: tuple, submit: Callable[[], Future]) -> Future:
+        """Cached value, the computation already in flight, or a new one"""
+        key = (name, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                future = Future()
+                future.set_result(entry[1])
+                return future
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            generation = self._generations.get(name, 0)
+            future = submit()
+            self._inflight[key] = future
+        future.add_done_callback(lambda f: self._store(key, generation, f))
+        return future
+
+    def _store(self, key: tuple, generation: int, future: Future):
+        name = key[0]
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if (
+                not self.ready
+                or future.cancelled()
+                or future.exception() is not None
+                or self._generations.get(name, 0) != generation
+            ):
+                return
+            ttl = self.policies.get(name, (0, ()))[0]
+            self._entries[key] = (time.monotonic() + ttl, future.result())
+
+    def invalidate(self, topics: Iterable[str]):
+        topics = set(topics)
+        with self._lock:
+            names = {name for name, (_, deps) in self.policies.items() if deps & topics}
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            for key in [k for k in self._entries if k[0] in names]:
+                del self._entries[key]
+
+    def handle_event(self, event: dict):
+        """Handler of the "dashboard" channel"""
+        self.invalidate(event.get("topics", ()))
+
+    def topic_handler(self, topic: str) -> Callable[[dict], None]:
+        """Handler for a channel whose every event is a write on topic"""
+        return lambda event: self.invalidate((topic,))
+
+    def clear(self):
+        with self._lock:
+            for name in self.policies:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            self._entries.clear()
+
+    def enable(self):
+        """on_connect handler: start empty"""
+        self.clear()
+        self.ready = True
+
+    def disable(self):
+        self.ready = False
+        self.clear()
+
+
+def invalidate_dashboard(db: Session, *topics: str):
+    """Invalidate the sections that depend on topics, in every worker, on commit"""
+    dashboard_cache.invalidate(topics)
+    publish(db, "dashboard", {"topics": list(topics)})
+
+
+dashboard_cache = DashboardCache()
@@ -86,13 +86,15 @@ class GenderStats(BaseModel):
     total: int
 
 class DashboardSummary(BaseModel):
-    metrics: DashboardMetrics
-    payment_metrics: PaymentMetrics 
-    expiring_subscriptions: List[ExpiringSubscription]
-    recent_checkins: List[RecentCheckIn]
-    recent_payments: List[RecentPayment] 
-    weekly_stats: List[DailyAttendanceStats]
-    weekly_income: List[DailyIncomeStats]
-    plan_metrics: List[PlanMetric]
+    # Sections that timed out or failed come back empty and are listed in degraded
+    metrics: Optional[DashboardMetrics] = None
+    payment_metrics: Optional[PaymentMetrics] = None
+    expiring_subscriptions: List[ExpiringSubscription] = []
+    recent_checkins: List[RecentCheckIn] = []
+    recent_payments: List[RecentPayment] = []
+    weekly_stats: List[DailyAttendanceStats] = []
+    weekly_income: List[DailyIncomeStats] = []
+    plan_metrics: List[PlanMetric] = []
     upcoming_birthdays: List[dict] = []
-    gender_stats: GenderStats = GenderStats(masculino=0, femenino=0, sin_dato=0, total=0)
\ No newline at end of file
+    gender_stats: GenderStats = GenderStats(masculino=0, femenino=0, sin_dato=0, total=0)
+    degraded: List[str] = []
\ No newline at end of file
@@ -1,12 +1,14 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, text
 from datetime import date, timedelta
 from typing import List
 
 from members.models import Member
 from subscriptions.models import Subscription
 from attendance.models import Attendance
+from attendance.occupancy import occupancy
 from plans.models import Plan
+from plans.service import plan_catalog
 from .schemas import (
     DashboardMetrics,
     PaymentMetrics,
@@ -35,41 +37,57 @@ SPANISH_DAYS = {
     6: "Domingo"
 }
 
-def get_dashboard_metrics(db: Session) -> DashboardMetrics:
-    today = get_today()
-    yesterday = today - timedelta(days=1)
+# All dashboard counters in one round trip. Each table is scanned once and
+# the attendance range stays on the current partitions.
+DASHBOARD_COUNTS_SQL = text("""
+    WITH visits AS (
+        SELECT count(*) FILTER (WHERE date = :today) AS today_visits,
+               count(*) FILTER (WHERE date = :yesterday) AS yesterday_visits
+        FROM attendance
+        WHERE date BETWEEN :yesterday AND :today
+    ),
+    open_sessions AS (
+        SELECT count(*) AS current_in_gym
+        FROM attendance
+        WHERE check_out_time IS NULL
+    ),
+    member_counts AS (
+        SELECT count(*) FILTER (WHERE is_active) AS total_members,
+               count(*) FILTER (WHERE is_active AND gender = 'masculino') AS masculino,
+               count(*) FILTER (WHERE is_active AND gender = 'femenino') AS femenino
+        FROM members
+    ),
+    subscription_counts AS (
+        SELECT count(*) AS active_subscriptions
+        FROM subscriptions
+        WHERE status = 'active' AND end_date >= :today
+    )
+    SELECT * FROM visits, open_sessions, member_counts, subscription_counts
+""")
 
-    current_in_gym = db.query(Attendance).filter(
-        Attendance.check_out_time.is_(None)
-    ).count()
+def get_dashboard_counts(db: Session):
+    """Counters shared by get_dashboard_metrics and get_gender_stats"""
+    today = get_today()
+    return db.execute(
+        DASHBOARD_COUNTS_SQL, {"today": today, "yesterday": today - timedelta(days=1)}
+    ).one()
 
-    today_visits = db.query(Attendance).filter(
-        Attendance.date == today
-    ).count()
+def get_dashboard_metrics(db: Session, counts=None) -> DashboardMetrics:
+    if counts is None:
+        counts = get_dashboard_counts(db)
 
-    yesterday_visits = db.query(Attendance).filter(
-        Attendance.date == yesterday
-    ).count()
+    current_in_gym = occupancy.count() if occupancy.ready else counts.current_in_gym
 
     visits_change = 0
-    if yesterday_visits > 0:
-        visits_change = ((today_visits - yesterday_visits) / yesterday_visits) * 100
-
-    total_members = db.query(Member).filter(Member.is_active == True).count()
-
-    active_subscriptions = db.query(Subscription).filter(
-        and_(
-            Subscription.status == "active",
-            Subscription.end_date >= today
-        )
-    ).count()
+    if counts.yesterday_visits > 0:
+        visits_change = ((counts.today_visits - counts.yesterday_visits) / counts.yesterday_visits) * 100
 
     return DashboardMetrics(
         current_in_gym=current_in_gym,
-        today_visits=today_visits,
+        today_visits=counts.today_visits,
         today_visits_change=visits_change,
-        total_members=total_members,
-        active_subscriptions=active_subscriptions
+        total_members=counts.total_members,
+        active_subscriptions=counts.active_subscriptions
     )
 
 def get_hourly_attendance(db: Session):
@@ -100,9 +118,12 @@ def get_expiring_subscriptions(db: Session, days: int = 7) -> List[ExpiringSubsc
         )
     ).order_by(Subscription.end_date.asc()).all()
     
+    _, plans = plan_catalog.snapshot(db)
     result = []
     for sub in subscriptions:
         days_remaining = (sub.end_date - today).days
+        # A plan created moments ago may not be in this worker's catalog yet
+        plan = plans.get(sub.plan_id) or sub.plan
         result.append(ExpiringSubscription(
             id=sub.id,
             member=MemberBasicInfo(
@@ -112,8 +133,8 @@ def get_expiring_subscriptions(db: Session, days: int = 7) -> List[ExpiringSubsc
                 last_name_maternal=sub.member.last_name_maternal
             ),
             plan=PlanBasicInfo(
-                id=sub.plan.id,
-                name=sub.plan.name
+                id=plan.id,
+                name=plan.name
             ),
             end_date=sub.end_date,
             days_remaining=days_remaining
@@ -155,28 +176,15 @@ def get_recent_checkins(db: Session, limit: int = 15) -> List[RecentCheckIn]:
     
     return result
 
-def get_gender_stats(db: Session) -> dict:
-    from sqlalchemy import func
-    
-    total = db.query(Member).filter(Member.is_active == True).count()
-    
-    masculino = db.query(Member).filter(
-        Member.is_active == True,
-        Member.gender == 'masculino'
-    ).count()
-    
-    femenino = db.query(Member).filter(
-        Member.is_active == True,
-        Member.gender == 'femenino'
-    ).count()
-    
-    sin_dato = total - masculino - femenino
+def get_gender_stats(db: Session, counts=None) -> dict:
+    if counts is None:
+        counts = get_dashboard_counts(db)
     
     return {
-        "masculino": masculino,
-        "femenino": femenino,
-        "sin_dato": sin_dato,
-        "total": total
+        "masculino": counts.masculino,
+        "femenino": counts.femenino,
+        "sin_dato": counts.total_members - counts.masculino - counts.femenino,
+        "total": counts.total_members
     }
 
 def get_weekly_attendance_stats(db: Session, days: int = 5) -> List[DailyAttendanceStats]:
@@ -234,22 +242,16 @@ def get_payment_metrics(db: Session) -> PaymentMetrics:
         PaymentRecord.payment_date >= month_start
     ).scalar() or Decimal("0.00")
     
-    pending_subs = db.query(Subscription).join(Plan).filter(
-        and_(
-            Subscription.status == "active",
-            Subscription.payment_status.in_(["pending", "partial"])
-        )
-    ).all()
-    
-    pending_amount = sum(
-        float(sub.plan.price) - float(sub.amount_paid) 
-        for sub in pending_subs
-    )
+    # Served by the partial index ix_subscriptions_receivable
+    pending_amount = db.query(func.coalesce(func.sum(Subscription.balance_due), 0)).filter(
+        Subscription.status == "active",
+        Subscription.balance_due > 0
+    ).scalar()
     
     return PaymentMetrics(
         today_income=float(today_payments),
         month_income=float(month_payments),
-        pending_payments=pending_amount
+        pending_payments=float(pending_amount)
     )
 
 def get_recent_payments(db: Session, limit: int = 5) -> List[RecentPayment]:
@@ -328,38 +330,44 @@ def get_plan_metrics(db: Session) -> List[dict]:
         'active_subscriptions': stat.active_count
     } for stat in plan_stats]
 
+# One row per day in the window (birthdays born on Feb 29 fall on Feb 28 in
+# non-leap years), joined to ix_members_birthday_mmdd
+UPCOMING_BIRTHDAYS_SQL = text("""
+    WITH window_days AS (
+        SELECT d::date AS birthday_date, birthday_mmdd(d::date) AS mmdd
+        FROM generate_series(CAST(:today AS date), CAST(:today AS date) + :days, interval '1 day') d
+    ),
+    targets AS (
+        SELECT birthday_date, mmdd FROM window_days
+        UNION ALL
+        SELECT birthday_date, 229 FROM window_days
+        WHERE mmdd = 228
+          AND extract(day FROM make_date(extract(year FROM birthday_date)::int, 3, 1) - 1) = 28
+    )
+    SELECT m.id,
+           m.first_name || ' ' || m.last_name_paternal AS full_name,
+           m.phone,
+           m.date_of_birth,
+           t.birthday_date,
+           t.birthday_date - CAST(:today AS date) AS days_until,
+           (extract(year FROM t.birthday_date) - extract(year FROM m.date_of_birth))::int AS age_turning
+    FROM targets t
+    JOIN members m
+      ON birthday_mmdd(m.date_of_birth) = t.mmdd
+     AND m.is_active AND m.date_of_birth IS NOT NULL
+    ORDER BY days_until, m.id
+""")
+
 def get_upcoming_birthdays(db: Session, days: int = 5) -> List[dict]:
     """Get members with birthdays in the next X days"""
-    today = get_today()
-    members = db.query(Member).filter(Member.is_active == True, Member.date_of_birth != None).all()
+    rows = db.execute(UPCOMING_BIRTHDAYS_SQL, {"today": get_today(), "days": days}).all()
     
-    upcoming = []
-    for member in members:
-        birth = member.date_of_birth
-        
-        try:
-            birthday_this_year = birth.replace(year=today.year)
-        except ValueError:
-            birthday_this_year = birth.replace(year=today.year, day=28)
-        
-        days_until = (birthday_this_year - today).days
-        
-        if days_until < 0:
-            try:
-                birthday_this_year = birth.replace(year=today.year + 1)
-            except ValueError:
-                birthday_this_year = birth.replace(year=today.year + 1, day=28)
-            days_until = (birthday_this_year - today).days
-        
-        if 0 <= days_until <= days:
-            upcoming.append({
-                "id": member.id,
-                "full_name": f"{member.first_name} {member.last_name_paternal}",
-                "phone": member.phone,
-                "birth_date": birth.isoformat(),
-                "birthday_date": birthday_this_year.isoformat(),
-                "days_until": days_until,
-                "age_turning": today.year - birth.year if birthday_this_year.year == today.year else today.year - birth.year + 1
-            })
-    
-    return sorted(upcoming, key=lambda x: x["days_until"])
\ No newline at end of file
+    return [{
+        "id": row.id,
+        "full_name": row.full_name,
+        "phone": row.phone,
+        "birth_date": row.date_of_birth.isoformat(),
+        "birthday_date": row.birthday_date.isoformat(),
+        "days_until": row.days_until,
+        "age_turning": row.age_turning
+    } for row in rows]
@@ -0,0 +1,116 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from .cache import dashboard_cache
+from .schemas import DashboardSummary
+from .services import (
+    get_dashboard_counts,
+    get_dashboard_metrics,
+    get_payment_metrics,
+    get_expiring_subscriptions,
+    get_recent_checkins,
+    get_recent_payments,
+    get_weekly_attendance_stats,
+    get_weekly_income_stats,
+    get_plan_metrics,
+    get_upcoming_birthdays,
+    get_gender_stats
+)
+
+logger = logging.getLogger(__name__)
+
+# Keep below the engine pool size (5) so the dashboard never starves other requests
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", "4"))
+DASHBOARD_SECTION_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_SECTION_TIMEOUT_SECONDS", "5"))
+
+executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+
+def _counts_section(db: Session) -> dict:
+    counts = get_dashboard_counts(db)
+    return {
+        "metrics": get_dashboard_metrics(db, counts),
+        "gender_stats": get_gender_stats(db, counts)
+    }
+
+
+Section = Tuple[tuple, Callable[[Session], dict]]
+
+
+def dashboard_sections(expiring_days: int, recent_limit: int, stats_days: int) -> Dict[str, Section]:
+    """Independent sections: name -> (cache parameters, function(db) returning DashboardSummary fields)"""
+    return {
+        "counts": ((), _counts_section),
+        "payment_metrics": ((), lambda db: {"payment_metrics": get_payment_metrics(db)}),
+        "expiring_subscriptions": (
+            (expiring_days,),
+            lambda db: {"expiring_subscriptions": get_expiring_subscriptions(db, days=expiring_days)}
+        ),
+        "recent_checkins": ((), lambda db: {"recent_checkins": get_recent_checkins(db, limit=5)}),
+        "recent_payments": (
+            (recent_limit,),
+            lambda db: {"recent_payments": get_recent_payments(db, limit=recent_limit)}
+        ),
+        "weekly_stats": (
+            (stats_days,),
+            lambda db: {"weekly_stats": get_weekly_attendance_stats(db, days=stats_days)}
+        ),
+        "weekly_income": (
+            (stats_days,),
+            lambda db: {"weekly_income": get_weekly_income_stats(db, days=stats_days)}
+        ),
+        "plan_metrics": ((), lambda db: {"plan_metrics": get_plan_metrics(db)}),
+        "upcoming_birthdays": ((), lambda db: {"upcoming_birthdays": get_upcoming_birthdays(db, days=5)}),
+    }
+
+
+def run_section(func: Callable[[Session], dict], timeout: float) -> dict:
+    """Run one section on its own pooled connection"""
+    db = SessionLocal()
+    try:
+        # Stop the query on the server too, not just stop waiting for it
+        db.execute(
+            text("SELECT set_config('statement_timeout', :ms, true)"),
+            {"ms": str(int(timeout * 1000))}
+        )
+        return func(db)
+    finally:
+        db.close()
+
+
+def run_sections(
+    sections: Dict[str, Section],
+    timeout: float = DASHBOARD_SECTION_TIMEOUT_SECONDS
+):
+    """Run sections concurrently, through the cache. Returns (fields, degraded section names)."""
+    futures = {
+        name: dashboard_cache.get(name, params, lambda func=func: executor.submit(run_section, func, timeout))
+        for name, (params, func) in sections.items()
+    }
+    wait(futures.values(), timeout=timeout)
+
+    fields, degraded = {}, []
+    for name, future in futures.items():
+        if not future.done():
+            # Left running: other requests may be waiting on it and its
+            # result still fills the cache
+            logger.warning("Dashboard section %s timed out after %ss", name, timeout)
+            degraded.append(name)
+            continue
+        try:
+            fields.update(future.result())
+        except Exception:
+            logger.exception("Dashboard section %s failed", name)
+            degraded.append(name)
+    return fields, degraded
+
+
+def build_dashboard_summary(expiring_days: int, recent_limit: int, stats_days: int) -> DashboardSummary:
+    fields, degraded = run_sections(dashboard_sections(expiring_days, recent_limit, stats_days))
+    return DashboardSummary(**fields, degraded=degraded)
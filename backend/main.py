@@ -1,6 +1,8 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
+from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from database import engine, Base, get_db
 import os
 from dotenv import load_dotenv
 
@@ -17,13 +19,78 @@ from users.routes import router as users_router
 from reports.routes import router as reports_router
 from database_backup.routes import router as backup_router
 
+# Background jobs
+from shared.scheduler import scheduler
+from shared.events import event_bus
+from attendance.occupancy import occupancy
+from attendance.stream import broadcaster, prune_events_job
+from attendance.eligibility import eligibility
+from members.search import member_index
+from plans.service import plan_catalog
+from dashboard.cache import dashboard_cache
+from attendance.debounce import scan_debouncer
+from attendance.service import auto_checkout_job, AUTO_CHECKOUT_INTERVAL_SECONDS
+from shared.partitions import partition_maintenance_job
+from attendance.archive import archive_job
+from subscriptions.service import expire_subscriptions_job
+from payments.service import reconcile_payments_job
+
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scheduler.add_job("auto_checkout", auto_checkout_job, AUTO_CHECKOUT_INTERVAL_SECONDS)
+    scheduler.add_job("prune_attendance_events", prune_events_job, 3600)
+    scheduler.add_job("partition_maintenance", partition_maintenance_job, 86400)
+    scheduler.add_job("archive_attendance", archive_job, 86400)
+    scheduler.add_job("expire_subscriptions", expire_subscriptions_job, 3600)
+    scheduler.add_job("reconcile_payments", reconcile_payments_job, 86400)
+    scheduler.start()
+    event_bus.subscribe(
+        "attendance",
+        occupancy.apply,
+        on_connect=occupancy.rebuild,
+        on_disconnect=occupancy.invalidate
+    )
+    event_bus.subscribe("attendance", broadcaster.publish, on_connect=broadcaster.catch_up)
+    event_bus.subscribe(
+        "eligibility",
+        eligibility.handle_event,
+        on_connect=eligibility.enable,
+        on_disconnect=eligibility.disable
+    )
+    event_bus.subscribe("scans", scan_debouncer.handle_event)
+    event_bus.subscribe(
+        "plans",
+        plan_catalog.handle_event,
+        on_connect=plan_catalog.enable,
+        on_disconnect=plan_catalog.disable
+    )
+    event_bus.subscribe(
+        "members",
+        member_index.apply,
+        on_connect=member_index.rebuild,
+        on_disconnect=member_index.invalidate
+    )
+    event_bus.subscribe(
+        "dashboard",
+        dashboard_cache.handle_event,
+        on_connect=dashboard_cache.enable,
+        on_disconnect=dashboard_cache.disable
+    )
+    for channel in ("attendance", "members", "plans"):
+        event_bus.subscribe(channel, dashboard_cache.topic_handler(channel))
+    event_bus.start()
+    yield
+    event_bus.stop()
+    scheduler.stop()
+
 app = FastAPI(
     title="F3 Manager API",
     description="API para gestión de gimnasio FU3RZA FIT",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -58,4 +125,8 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/jobs")
+def jobs_status(db: Session = Depends(get_db)):
+    return {"jobs": scheduler.status(db)}
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Date, Boolean, DateTime, Index, ForeignKey, func, text
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
 
 class Member(Base):
     __tablename__ = 'members'
+    __table_args__ = (
+        # Paginación por cursor (created_at, id)
+        Index("ix_members_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(50), nullable=False)
@@ -21,8 +25,33 @@ class Member(Base):
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now)
+    # Id de la transacción que cambió la elegibilidad (lo ponen los triggers)
+    eligibility_version = Column(
+        BigInteger,
+        server_default=text("pg_current_xact_id()::text::bigint"),
+        nullable=False,
+        index=True
+    )
+    # Suscripción 'active' con end_date más lejano; la mantiene el trigger
+    # subscriptions_current_pointer
+    current_subscription_id = Column(
+        Integer,
+        ForeignKey("subscriptions.id", ondelete="SET NULL", use_alter=True),
+        nullable=True
+    )
+    current_subscription_end_date = Column(Date, nullable=True, index=True)
     
     # Relationships
-    subscriptions = relationship("Subscription", back_populates="member")
+    subscriptions = relationship("Subscription", back_populates="member", foreign_keys="Subscription.member_id")
+    current_subscription = relationship("Subscription", foreign_keys=[current_subscription_id], viewonly=True)
     payments = relationship("PaymentRecord", back_populates="member")
-    attendances = relationship("Attendance", back_populates="member")
\ No newline at end of file
+    attendances = relationship("Attendance", back_populates="member")
+
+# Texto de búsqueda normalizado (índice GIN ix_members_search_trgm)
+member_search_text = func.member_search_text(
+    Member.first_name,
+    Member.last_name_paternal,
+    Member.last_name_maternal,
+    Member.email,
+    Member.phone
+)
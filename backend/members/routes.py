@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_
+from sqlalchemy import and_
 from database import get_db
-from .models import Member
+from .models import Member, member_search_text
 from .schemas import MemberResponse, MemberCreate, MemberUpdate
 from datetime import date, datetime
 from typing import Optional
 from members.schemas import MemberResponseWithSubscription, ActiveSubscriptionInfo
 from subscriptions.models import Subscription
+from attendance.eligibility import invalidate_eligibility
+from shared.pagination import keyset_page, next_cursor
+from members.search import member_index, index_member
+from shared.search import contains, rank
 from zoneinfo import ZoneInfo
 
 router = APIRouter(prefix="/members", tags=["Members"])
@@ -29,23 +33,15 @@ def get_members(
     is_active: Optional[bool] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (instead of skip)"),
     db: Session = Depends(get_db)
 ):
     """Get all members with optional filters and pagination"""
     query = db.query(Member)
     
-    # Search filter
+    # Search filter (accent-insensitive, uses the trigram index)
     if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                Member.first_name.ilike(search_pattern),
-                Member.last_name_paternal.ilike(search_pattern),
-                Member.last_name_maternal.ilike(search_pattern),
-                Member.email.ilike(search_pattern),
-                Member.phone.ilike(search_pattern)
-            )
-        )
+        query = query.filter(contains(member_search_text, search))
         
     # Active status filter
     if is_active is not None:
@@ -54,21 +50,24 @@ def get_members(
     # Get total count before pagination
     total = query.count()
     
-    # Apply pagination
-    members = query.options(
-        joinedload(Member.subscriptions).joinedload(Subscription.plan)
-    ).order_by(Member.created_at.desc()).offset(skip).limit(limit).all()
+    # Apply pagination (keyset when a cursor is given)
+    # Only the current subscription is loaded (one row per member)
+    query = query.options(joinedload(Member.current_subscription).joinedload(Subscription.plan))
+    if search:
+        # Best matches first; ranked results page with skip only
+        cursor = None
+        query = query.order_by(rank(member_search_text, search).desc())
+    members = keyset_page(query, Member.created_at, Member.id, cursor, limit, skip=skip).all()
 
+    today = get_today_mx()
     members_data = []
     for member in members:
-        active_sub = next(
-            (s for s in member.subscriptions 
-                if s.status == "active" and s.end_date >= get_today_mx()),
-            None
-        )
+        active_sub = None
+        if member.current_subscription_end_date and member.current_subscription_end_date >= today:
+            active_sub = member.current_subscription
         member_dict = MemberResponseWithSubscription.model_validate(member)
         if active_sub:
-            days_remaining = (active_sub.end_date - get_today_mx()).days
+            days_remaining = (active_sub.end_date - today).days
             member_dict.active_subscription = ActiveSubscriptionInfo(
                 status="active",
                 end_date=active_sub.end_date,
@@ -81,9 +80,33 @@ def get_members(
         "members": members_data,
         "total": total,
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": None if search else next_cursor(members, limit, "created_at")
     }
 
+@router.get("/suggest")
+def suggest_members(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=25),
+    db: Session = Depends(get_db)
+):
+    """Typeahead: members whose name, email or phone contains q (accent-insensitive)"""
+    if member_index.ready:
+        return member_index.suggest(q, limit)
+    members = db.query(Member).filter(
+        contains(member_search_text, q)
+    ).order_by(rank(member_search_text, q).desc(), Member.id).limit(limit).all()
+    return [
+        {
+            "id": m.id,
+            "full_name": " ".join(p for p in (m.first_name, m.last_name_paternal, m.last_name_maternal) if p),
+            "email": m.email,
+            "phone": m.phone,
+            "is_active": m.is_active
+        }
+        for m in members
+    ]
+
 @router.get("/{member_id}", response_model=MemberResponse)
 def get_member(member_id: int, db: Session = Depends(get_db)):
     """Get a specific member by ID"""
@@ -117,6 +140,8 @@ def create_member(member: MemberCreate, db: Session = Depends(get_db)):
         is_active=True
     )
     db.add(db_member)
+    db.flush()
+    index_member(db, db_member)
     db.commit()
     db.refresh(db_member)
     return db_member
@@ -157,6 +182,8 @@ def update_member(member_id: int, member: MemberUpdate, db: Session = Depends(ge
         setattr(db_member, key, value)
     
     db_member.updated_at = datetime.now()
+    invalidate_eligibility(db, member_id)
+    index_member(db, db_member)
     db.commit()
     db.refresh(db_member)
     return db_member
@@ -170,6 +197,8 @@ def toggle_member_status(member_id: int, db: Session = Depends(get_db)):
     
     db_member.is_active = not db_member.is_active
     db_member.updated_at = datetime.now()
+    invalidate_eligibility(db, member_id)
+    index_member(db, db_member)
     db.commit()
     db.refresh(db_member)
     return db_member
@@ -183,5 +212,7 @@ def delete_member(member_id: int, db: Session = Depends(get_db)):
     
     # Soft delete
     db_member.is_active = False
+    invalidate_eligibility(db, member_id)
+    index_member(db, db_member)
     db.commit()
     return {"message": "Miembro desactivado correctamente"}
\ No newline at end of file
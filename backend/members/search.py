@@ -0,0 +1,213 @@
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from members.models import Member
+from shared.events import publish
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ("first_name", "last_name_paternal", "last_name_maternal", "email", "phone", "is_active")
+
+
+def fold(value: Optional[str]) -> str:
+    """Minúsculas y sin acentos (á -> a, ñ -> n)"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# Largo máximo de los prefijos indexados; consultas más largas filtran la
+# lista del prefijo de PREFIX_LEN caracteres
+PREFIX_LEN = 4
+# Miembros cambiados desde la última compactación; al pasar de aquí se
+# reconstruyen las listas en otro hilo
+RECENT_LIMIT = 200
+
+Postings = Dict[str, List[Tuple[str, int]]]
+
+
+def _word_prefixes(words: Set[str]) -> Set[str]:
+    return {w[:n] for w in words for n in range(1, min(len(w), PREFIX_LEN) + 1)}
+
+
+def _build_postings(texts: Dict[int, str], member_words: Dict[int, Set[str]], keys: Dict[int, Tuple[str, int]]):
+    grams: Postings = {}
+    prefixes: Postings = {}
+    for member_id, key in keys.items():
+        for gram in trigrams(texts[member_id]):
+            grams.setdefault(gram, []).append(key)
+        for prefix in _word_prefixes(member_words[member_id]):
+            prefixes.setdefault(prefix, []).append(key)
+    for items in list(grams.values()) + list(prefixes.values()):
+        items.sort()
+    return grams, prefixes
+
+
+class MemberSearchIndex:
+    """
+    Índice en memoria para el typeahead de miembros (nombre, email, teléfono).
+
+    Trigramas para buscar subcadenas de 3 o más caracteres y prefijos de
+    palabra (hasta PREFIX_LEN caracteres) para los que empiezan con la
+    consulta. Las listas están ordenadas por nombre, así que suggest se
+    detiene al juntar limit resultados, y no se modifican después de
+    construirse: suggest las recorre fuera del lock. Los miembros cambiados
+    después van en _recent (se revisan completos, son pocos) hasta la
+    siguiente compactación. Se reconstruye al conectar el bus y se actualiza
+    con el canal "members"; mientras ready sea False las rutas deben buscar
+    en la base de datos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, dict] = {}
+        self._texts: Dict[int, str] = {}
+        self._member_words: Dict[int, Set[str]] = {}
+        self._keys: Dict[int, Tuple[str, int]] = {}
+        # término -> [(nombre normalizado, member_id)] ordenada por nombre
+        self._grams: Postings = {}
+        self._prefixes: Postings = {}
+        # member_id -> número de cambio, para los que no están en las listas
+        self._recent: Dict[int, int] = {}
+        self._changes = 0
+        self._compacting = False
+        self.ready = False
+
+    def rebuild(self):
+        db = SessionLocal()
+        try:
+            rows = db.query(Member.id, *(getattr(Member, f) for f in SEARCH_FIELDS)).all()
+        finally:
+            db.close()
+        entries, texts, member_words, keys = {}, {}, {}, {}
+        for row in rows:
+            entry, text, words = self._parse(row._asdict())
+            member_id = entry["id"]
+            entries[member_id], texts[member_id], member_words[member_id] = entry, text, words
+            keys[member_id] = (fold(entry["full_name"]), member_id)
+        grams, prefixes = _build_postings(texts, member_words, keys)
+        with self._lock:
+            self._entries, self._texts, self._member_words, self._keys = entries, texts, member_words, keys
+            self._grams, self._prefixes = grams, prefixes
+            self._recent = {}
+            self.ready = True
+        logger.info("Índice de búsqueda de miembros reconstruido: %s miembros", len(rows))
+
+    def invalidate(self):
+        with self._lock:
+            self.ready = False
+
+    def apply(self, event: dict):
+        """Handler del bus: reemplazar la entrada de un miembro"""
+        entry, text, words = self._parse(event)
+        member_id = entry["id"]
+        with self._lock:
+            self._entries[member_id] = entry
+            self._texts[member_id] = text
+            self._member_words[member_id] = words
+            self._keys[member_id] = (fold(entry["full_name"]), member_id)
+            self._changes += 1
+            self._recent[member_id] = self._changes
+            compact = len(self._recent) > RECENT_LIMIT and not self._compacting
+            if compact:
+                self._compacting = True
+        if compact:
+            threading.Thread(target=self._compact, name="member-index-compact", daemon=True).start()
+
+    def _compact(self):
+        """Reconstruir las listas con los datos en memoria e integrar _recent"""
+        try:
+            with self._lock:
+                texts, member_words, keys = dict(self._texts), dict(self._member_words), dict(self._keys)
+                upto = self._changes
+            grams, prefixes = _build_postings(texts, member_words, keys)
+            with self._lock:
+                self._grams, self._prefixes = grams, prefixes
+                self._recent = {i: n for i, n in self._recent.items() if n > upto}
+        finally:
+            self._compacting = False
+
+    @staticmethod
+    def _parse(entry: dict) -> Tuple[dict, str, Set[str]]:
+        words = [fold(entry.get(f)) for f in ("first_name", "last_name_paternal", "last_name_maternal")]
+        words = [w for part in words for w in part.split()]
+        email = fold(entry.get("email"))
+        phone = entry.get("phone") or ""
+        parsed = {
+            "id": entry["id"],
+            "full_name": " ".join(
+                p for p in (entry.get("first_name"), entry.get("last_name_paternal"), entry.get("last_name_maternal")) if p
+            ),
+            "email": entry.get("email"),
+            "phone": entry.get("phone"),
+            "is_active": entry.get("is_active"),
+        }
+        return parsed, " ".join(words + [email, phone]), {w for w in words + [email, phone] if w}
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        """Miembros cuyo nombre, email o teléfono contiene query. Primero los que
+        tienen una palabra que empieza con query."""
+        q = fold(query).strip()
+        if not q:
+            return []
+        first_word = q.split()[0]
+        # Bajo el lock sólo se toman referencias (y la copia de _recent)
+        with self._lock:
+            prefix_posting = self._prefixes.get(first_word[:PREFIX_LEN], [])
+            gram_posting = None
+            if len(q) >= 3:
+                gram_posting = min((self._grams.get(g, []) for g in trigrams(q)), key=len)
+            recent = dict(self._recent)
+            entries, texts, member_words, keys = self._entries, self._texts, self._member_words, self._keys
+
+        def matches(member_id: int, require_prefix: bool) -> bool:
+            text = texts.get(member_id)
+            if text is None or q not in text:
+                return False
+            return not require_prefix or any(w.startswith(first_word) for w in member_words.get(member_id, ()))
+
+        found: List[int] = []
+        seen: Set[int] = set()
+
+        def collect(posting, require_prefix: bool):
+            # Los cambiados recientemente se ordenan aparte por su nombre actual
+            wanted = limit - len(found)
+            hits = []
+            for key in posting:
+                member_id = key[1]
+                if member_id in seen or member_id in recent:
+                    continue
+                if matches(member_id, require_prefix):
+                    hits.append(key)
+                    if len(hits) >= wanted:
+                        break
+            hits.extend(
+                keys[i] for i in recent
+                if i not in seen and i in keys and matches(i, require_prefix)
+            )
+            for _, member_id in sorted(hits)[:wanted]:
+                seen.add(member_id)
+                found.append(member_id)
+
+        collect(prefix_posting, True)
+        if len(found) < limit and gram_posting is not None:
+            collect(gram_posting, False)
+        return [dict(entries[i]) for i in found if i in entries]
+
+
+def index_member(db: Session, member: Member):
+    """Actualizar el índice de todos los workers al hacer commit"""
+    publish(db, "members", {"id": member.id, **{f: getattr(member, f) for f in SEARCH_FIELDS}})
+
+
+member_index = MemberSearchIndex()
@@ -1,16 +1,20 @@
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, Text, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, Text, ForeignKey, TIMESTAMP, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 
 class PaymentRecord(Base):
     __tablename__ = "payment_records"
+    __table_args__ = (
+        # Paginación por cursor (payment_date, id)
+        Index("ix_payment_records_payment_date_id", "payment_date", "id"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="CASCADE"), nullable=False)
     member_id = Column(Integer, ForeignKey("members.id", ondelete="CASCADE"), nullable=False)
     amount = Column(DECIMAL(10, 2), nullable=False)
-    payment_date = Column(Date, nullable=False)
+    payment_date = Column(Date, primary_key=True, index=True, nullable=False)  # llave de partición mensual
     payment_method = Column(String(20), nullable=False)
     reference_number = Column(String(100))
     notes = Column(Text)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, and_
 from typing import List, Optional
@@ -9,7 +9,11 @@ from database import get_db
 from payments.models import PaymentRecord
 from subscriptions.models import Subscription
 from members.models import Member
-from payments.schemas import PaymentRecordCreate, PaymentRecordUpdate, PaymentRecordResponse, PaymentSummary
+from attendance.eligibility import invalidate_eligibility
+from dashboard.cache import invalidate_dashboard
+from payments.service import post_payment
+from shared.pagination import keyset_page, next_cursor, parse_date, NEXT_CURSOR_HEADER
+from payments.schemas import PaymentRecordCreate, PaymentRecordUpdate, PaymentRecordResponse, PaymentSummary, ReceivablesSummary
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
@@ -37,19 +41,10 @@ def create_payment(payment: PaymentRecordCreate, db: Session = Depends(get_db)):
     db.add(db_payment)
     
     #update subscription payment info
-    total_paid = db.query(func.sum(PaymentRecord.amount)).filter(
-        PaymentRecord.subscription_id == payment.subscription_id
-    ).scalar() or Decimal("0.00")
-    
-    total_paid += payment.amount
-    subscription.amount_paid = total_paid
-    
-    #update payment status
-    if total_paid >= subscription.plan.price:
-        subscription.payment_status = "paid"
-    elif total_paid > 0:
-        subscription.payment_status = "partial"
+    post_payment(db, payment.subscription_id, payment.amount)
         
+    invalidate_eligibility(db, payment.member_id)
+    invalidate_dashboard(db, "payments")
     db.commit()
     db.refresh(db_payment)
     
@@ -57,6 +52,7 @@ def create_payment(payment: PaymentRecordCreate, db: Session = Depends(get_db)):
     
 @router.get("/", response_model=List[PaymentRecordResponse])
 def get_payments(
+    response: Response,
     member_id: Optional[int] = None,
     subscription_id: Optional[int] = None,
     payment_method: Optional[str] = Query(None, pattern="^(efectivo|tarjeta|transferencia|otro)$"),
@@ -64,6 +60,7 @@ def get_payments(
     end_date: Optional[date] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Header X-Next-Cursor de la página anterior (en lugar de skip)"),
     db: Session = Depends(get_db)
 ):
     """Listar pagos con filtros opcionales"""
@@ -80,10 +77,35 @@ def get_payments(
     if end_date:
         query = query.filter(PaymentRecord.payment_date <= end_date)
         
-    payments = query.order_by(PaymentRecord.payment_date.desc()).offset(skip).limit(limit).all()
+    payments = keyset_page(
+        query, PaymentRecord.payment_date, PaymentRecord.id, cursor, limit, skip=skip, parse=parse_date
+    ).all()
+    cursor_value = next_cursor(payments, limit, "payment_date")
+    if cursor_value:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
     
     return payments
 
+@router.get("/receivables", response_model=ReceivablesSummary)
+def get_receivables(limit: int = 100, db: Session = Depends(get_db)):
+    """Saldo pendiente de las suscripciones activas (las que vencen primero al inicio)"""
+    receivable = and_(Subscription.status == "active", Subscription.balance_due > 0)
+    
+    total_due, subscription_count = db.query(
+        func.coalesce(func.sum(Subscription.balance_due), 0),
+        func.count()
+    ).filter(receivable).one()
+    
+    subscriptions = db.query(Subscription).options(joinedload(Subscription.member)).filter(
+        receivable
+    ).order_by(Subscription.end_date, Subscription.id).limit(limit).all()
+    
+    return ReceivablesSummary(
+        total_due=total_due,
+        subscription_count=subscription_count,
+        subscriptions=subscriptions
+    )
+
 @router.get("/{payment_id}", response_model=PaymentRecordResponse)
 def get_payment(payment_id: int, db: Session = Depends(get_db)):
     """Obtener un pago específico"""
@@ -110,6 +132,7 @@ def update_payment(
     for field, value in update_data.items():
         setattr(db_payment, field, value)
         
+    invalidate_dashboard(db, "payments")
     db.commit()
     db.refresh(db_payment)
     
@@ -125,25 +148,14 @@ def delete_payment(payment_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_payment)
     
-    #recalculate subscription payment status
-    subscription = db.query(Subscription).filter(Subscription.id == db_payment.subscription_id).first()
-    if subscription:
-        total_paid = db.query(func.sum(PaymentRecord.amount)).filter(
-            PaymentRecord.subscription_id == db_payment.subscription_id
-        ).scalar() or Decimal("0.00")
-        
-        subscription.amount_paid = total_paid
-        
-        if total_paid >= subscription.plan.price:
-            subscription.payment_status = "paid"
-        elif total_paid > 0:
-            subscription.payment_status = "partial"
-        else:
-            subscription.payment_status = "pending"
-            
-        db.commit()
-        
-        return None
+    #reverse the payment on the subscription
+    post_payment(db, db_payment.subscription_id, -db_payment.amount)
+    
+    invalidate_eligibility(db, db_payment.member_id)
+    invalidate_dashboard(db, "payments")
+    db.commit()
+    
+    return None
     
 @router.get("/member/{member_id}/history", response_model=List[PaymentRecordResponse])
 def get_member_payment_history(member_id: int, db: Session = Depends(get_db)):
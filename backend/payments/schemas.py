@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional
 
 class PaymentRecordBase(BaseModel):
     subscription_id: int = Field(..., gt=0)
@@ -42,6 +42,22 @@ class PaymentRecordResponse(PaymentRecordBase):
         from_attributes = True
 
 # Payment schemas
+class Receivable(BaseModel):
+    id: int
+    member: MemberBasic
+    plan_price: Decimal
+    amount_paid: Decimal
+    balance_due: Decimal
+    end_date: date
+    
+    class Config:
+        from_attributes = True
+
+class ReceivablesSummary(BaseModel):
+    total_due: Decimal
+    subscription_count: int
+    subscriptions: List[Receivable]
+
 class PaymentSummary(BaseModel):
     total_amount: Decimal
     payment_count: int
@@ -0,0 +1,70 @@
+import logging
+from decimal import Decimal
+
+from sqlalchemy import case, func, text, update
+from sqlalchemy.orm import Session
+
+from subscriptions.models import Subscription
+
+logger = logging.getLogger(__name__)
+
+
+def post_payment(db: Session, subscription_id: int, amount: Decimal):
+    """Aplicar un pago (amount > 0) o una reversa (amount < 0) a una suscripción.
+
+    Un solo UPDATE atómico: suma el monto en Decimal y deriva payment_status
+    contra plan_price en la misma sentencia, así dos cajeros cobrando a la vez
+    no se pisan. No hace commit. Regresa (id, member_id, amount_paid,
+    payment_status) o None si la suscripción no existe.
+    """
+    new_amount = func.coalesce(Subscription.amount_paid, 0) + Decimal(amount)
+    stmt = (
+        update(Subscription)
+        .where(Subscription.id == subscription_id)
+        .values(
+            amount_paid=new_amount,
+            payment_status=case(
+                (new_amount >= Subscription.plan_price, "paid"),
+                (new_amount > 0, "partial"),
+                else_="pending"
+            )
+        )
+        .returning(
+            Subscription.id,
+            Subscription.member_id,
+            Subscription.amount_paid,
+            Subscription.payment_status
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).first()
+
+
+# Suscripciones cuyo amount_paid no coincide con la suma de sus pagos
+RECONCILE_SQL = text("""
+    SELECT s.id, COALESCE(s.amount_paid, 0) AS amount_paid, COALESCE(p.total, 0) AS ledger_total
+    FROM subscriptions s
+    LEFT JOIN (
+        SELECT subscription_id, sum(amount) AS total
+        FROM payment_records
+        GROUP BY subscription_id
+    ) p ON p.subscription_id = s.id
+    WHERE COALESCE(s.amount_paid, 0) <> COALESCE(p.total, 0)
+    ORDER BY s.id
+""")
+
+
+def reconcile_payments(db: Session):
+    """Comparar amount_paid contra el libro de pagos (sólo reporta)"""
+    return db.execute(RECONCILE_SQL).all()
+
+
+def reconcile_payments_job(db: Session) -> int:
+    """Tarea del scheduler: registrar las diferencias; regresa cuántas hay"""
+    mismatches = reconcile_payments(db)
+    for row in mismatches[:50]:
+        logger.warning(
+            "Suscripción %s: amount_paid %s, pagos registrados %s",
+            row.id, row.amount_paid, row.ledger_total
+        )
+    return len(mismatches)
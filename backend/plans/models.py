@@ -14,4 +14,7 @@ class Plan(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
     
-    subscriptions = relationship("Subscription", back_populates="plan")
\ No newline at end of file
+    subscriptions = relationship("Subscription", back_populates="plan")
+
+# Nombre normalizado (índice GIN ix_plans_name_trgm)
+plan_search_text = func.lower(func.immutable_unaccent(Plan.name))
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database import get_db
 from plans.models import Plan
 from plans.schemas import PlanCreate, PlanUpdate, PlanResponse
+from plans.service import plan_catalog, plans_etag
 from users.auth import get_current_user, require_admin
+from attendance.eligibility import invalidate_eligibility
 
 router = APIRouter(prefix="/plans", tags=["plans"])
 
@@ -29,38 +31,52 @@ def create_plan(
     
     db.add(db_plan)
     db.commit()
+    plan_catalog.clear()
     db.refresh(db_plan)
     
     return db_plan
 
+def not_modified(request: Request, response: Response, version: int) -> bool:
+    """Poner ETag y decir si el cliente ya tiene esta versión del catálogo"""
+    etag = plans_etag(version)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return etag in request.headers.get("if-none-match", "")
+
 @router.get("/", response_model=List[PlanResponse])
 def get_plans(
+    request: Request,
+    response: Response,
     active_only: Optional[bool] = None,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
 ):
-    """Listar todos los planes disponibles"""
-    query = db.query(Plan)
+    """Listar todos los planes disponibles (responde 304 con If-None-Match)"""
+    version, plans = plan_catalog.list(db, active_only)
     
-    if active_only is not None:
-        query = query.filter(Plan.is_active == active_only)
-        
-    plans = query.offset(skip).limit(limit).all()
+    if not_modified(request, response, version):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
     
-    return plans
+    return plans[skip:skip + limit]
 
 @router.get("/{plan_id}", response_model=PlanResponse)
 def get_plan(
     plan_id: int, 
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
 ):
     """Obtener un plan específico"""
-    plan = db.query(Plan).filter(Plan.id == plan_id).first()
+    version, plans = plan_catalog.snapshot(db)
+    plan = plans.get(plan_id)
     
     if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
     
+    if not_modified(request, response, version):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
+    
     return plan
 
 @router.put("/{plan_id}", response_model=PlanResponse)
@@ -88,8 +104,11 @@ def update_plan(
     update_data = plan_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_plan, field, value)
-        
+    
+    # El nombre del plan forma parte de la elegibilidad en caché
+    invalidate_eligibility(db)
     db.commit()
+    plan_catalog.clear()
     db.refresh(db_plan)
     
     return db_plan
@@ -112,5 +131,6 @@ def delete_plan(
     db_plan.is_active = False
     
     db.commit()
+    plan_catalog.clear()
     
     return None
\ No newline at end of file
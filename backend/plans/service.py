@@ -0,0 +1,114 @@
+import logging
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class CachedPlan(NamedTuple):
+    id: int
+    name: str
+    price: Decimal
+    duration_days: int
+    description: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+
+
+# Versión y planes en una sola sentencia, para que la versión corresponda
+# exactamente a los datos leídos (catalog_versions la sube el trigger de plans)
+CATALOG_SQL = text("""
+    SELECT v.version, p.id, p.name, p.price, p.duration_days, p.description,
+           p.is_active, p.created_at
+    FROM catalog_versions v
+    LEFT JOIN plans p ON true
+    WHERE v.name = 'plans'
+    ORDER BY p.id
+""")
+
+
+class PlanCatalog:
+    """
+    Catálogo de planes en memoria.
+
+    Se carga completo la primera vez que se pide y se descarta cuando llega
+    por el canal "plans" una versión distinta (el trigger plans_catalog_version
+    la publica con cada cambio a la tabla, venga de donde venga). Mientras el
+    bus esté desconectado cada lectura va a la base de datos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plans: Optional[Dict[int, CachedPlan]] = None
+        self.version: Optional[int] = None
+        self.ready = False
+
+    def _load(self, db: Session) -> Tuple[int, Dict[int, CachedPlan]]:
+        rows = db.execute(CATALOG_SQL).all()
+        version = rows[0].version if rows else 0
+        plans = {
+            row.id: CachedPlan(
+                id=row.id,
+                name=row.name,
+                price=row.price,
+                duration_days=row.duration_days,
+                description=row.description,
+                is_active=bool(row.is_active),
+                created_at=row.created_at
+            )
+            for row in rows if row.id is not None
+        }
+        return version, plans
+
+    def snapshot(self, db: Session) -> Tuple[int, Dict[int, CachedPlan]]:
+        """(versión, {id: plan}) del catálogo vigente"""
+        if not self.ready:
+            return self._load(db)
+        with self._lock:
+            if self._plans is None:
+                self.version, self._plans = self._load(db)
+                logger.info("Catálogo de planes cargado: versión %s, %s planes", self.version, len(self._plans))
+            return self.version, self._plans
+
+    def get(self, db: Session, plan_id: int) -> Optional[CachedPlan]:
+        return self.snapshot(db)[1].get(plan_id)
+
+    def list(self, db: Session, active_only: Optional[bool] = None) -> Tuple[int, List[CachedPlan]]:
+        version, plans = self.snapshot(db)
+        return version, [
+            p for p in plans.values()
+            if active_only is None or p.is_active == active_only
+        ]
+
+    def handle_event(self, event: dict):
+        """Handler del bus"""
+        with self._lock:
+            if event.get("version") != self.version:
+                self._plans = None
+
+    def clear(self):
+        with self._lock:
+            self._plans = None
+
+    def enable(self):
+        """Handler on_connect: recargar en la siguiente lectura"""
+        with self._lock:
+            self._plans = None
+            self.ready = True
+
+    def disable(self):
+        with self._lock:
+            self.ready = False
+            self._plans = None
+
+
+def plans_etag(version: int) -> str:
+    return f'W/"plans-{version}"'
+
+
+plan_catalog = PlanCatalog()
@@ -5,9 +5,23 @@ from database import get_db
 from datetime import datetime, timedelta, date
 from typing import Literal
 from decimal import Decimal
+from collections import Counter, namedtuple
+
+from attendance.archive import load_archived
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+TopMember = namedtuple("TopMember", ["id", "first_name", "last_name_paternal", "visit_count"])
+
+
+def _gender_bucket(gender) -> str:
+    g = (gender or '').lower()
+    if g in ('masculino', 'm', 'hombre'):
+        return 'masculino'
+    if g in ('femenino', 'f', 'mujer'):
+        return 'femenino'
+    return 'otro'
+
 @router.get("/summary")
 def get_reports_summary(
     period: Literal['week', 'month', 'year'] = Query('month'),
@@ -62,6 +76,10 @@ def get_reports_summary(
         Attendance.date <= today
     ).count()
     
+    # Meses archivados: sólo se leen si el periodo llega hasta ellos
+    archived = load_archived(db, start_date, today)
+    total_attendance += len(archived)
+
     days_in_period = (today - start_date).days
     daily_avg = round(total_attendance / days_in_period, 1) if days_in_period > 0 else 0
     
@@ -83,6 +101,29 @@ def get_reports_summary(
     ).order_by(
         desc('visit_count')
     ).limit(10).all()
+
+    if archived:
+        # Con archivo hay que sumar los conteos completos antes de elegir el top
+        visit_counts = Counter(row["member_id"] for row in archived)
+        live_counts = db.query(
+            Attendance.member_id,
+            func.count(Attendance.id)
+        ).filter(
+            Attendance.date >= start_date,
+            Attendance.date <= today
+        ).group_by(Attendance.member_id).all()
+        for member_id, count in live_counts:
+            visit_counts[member_id] += count
+        top_ids = [member_id for member_id, _ in visit_counts.most_common(10)]
+        names = {
+            m.id: m for m in db.query(
+                Member.id, Member.first_name, Member.last_name_paternal
+            ).filter(Member.id.in_(top_ids)).all()
+        }
+        top_members = [
+            TopMember(names[i].id, names[i].first_name, names[i].last_name_paternal, visit_counts[i])
+            for i in top_ids if i in names
+        ]
     
     # Retention
     total_members = db.query(Member).count()
@@ -186,13 +227,19 @@ def get_reports_summary(
         h = int(r.hour)
         if h not in hourly_gender_map:
             hourly_gender_map[h] = {'masculino': 0, 'femenino': 0, 'otro': 0}
-        g = (r.gender or '').lower()
-        if g in ('masculino', 'm', 'hombre'):
-            hourly_gender_map[h]['masculino'] += r.count
-        elif g in ('femenino', 'f', 'mujer'):
-            hourly_gender_map[h]['femenino'] += r.count
-        else:
-            hourly_gender_map[h]['otro'] += r.count
+        hourly_gender_map[h][_gender_bucket(r.gender)] += r.count
+
+    if archived:
+        genders = dict(db.query(Member.id, Member.gender).filter(
+            Member.id.in_({row["member_id"] for row in archived})
+        ).all())
+        for row in archived:
+            if row["member_id"] not in genders:
+                continue
+            h = row["check_in_time"].hour
+            if h not in hourly_gender_map:
+                hourly_gender_map[h] = {'masculino': 0, 'femenino': 0, 'otro': 0}
+            hourly_gender_map[h][_gender_bucket(genders[row["member_id"]])] += 1
 
     hourly_distribution = [
         {
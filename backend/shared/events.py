@@ -0,0 +1,123 @@
+import json
+import logging
+import select
+import threading
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+
+def publish(db: Session, channel: str, payload: dict):
+    """Encolar una notificación; Postgres la entrega al hacer commit de la transacción"""
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": json.dumps(payload, default=str)},
+    )
+
+
+class EventBus:
+    """
+    Escucha canales de Postgres (LISTEN/NOTIFY) en un hilo propio y reparte
+    cada notificación a los handlers suscritos.
+
+    Los handlers on_connect se llaman después de cada (re)conexión, cuando ya
+    se está escuchando, para que los cachés en memoria se reconstruyan sin
+    perder eventos.
+    """
+
+    def __init__(self, dsn: str = DATABASE_URL, poll_seconds: float = 30.0, retry_seconds: float = 5.0):
+        self.dsn = dsn
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self.handlers: Dict[str, List[Callable[[dict], None]]] = {}
+        self.connect_handlers: List[Callable[[], None]] = []
+        self.disconnect_handlers: List[Callable[[], None]] = []
+        self.connected = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[dict], None],
+        on_connect: Optional[Callable[[], None]] = None,
+        on_disconnect: Optional[Callable[[], None]] = None,
+    ):
+        self.handlers.setdefault(channel, []).append(handler)
+        if on_connect:
+            self.connect_handlers.append(on_connect)
+        if on_disconnect:
+            self.disconnect_handlers.append(on_disconnect)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    for channel in self.handlers:
+                        cur.execute(f'LISTEN "{channel}"')
+                self.connected = True
+                for handler in self.connect_handlers:
+                    handler()
+                self._listen(conn)
+            except Exception:
+                logger.exception("Error en el bus de eventos, reconectando")
+            finally:
+                if self.connected:
+                    self.connected = False
+                    for handler in self.disconnect_handlers:
+                        handler()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(self.retry_seconds)
+
+    def _listen(self, conn):
+        while not self._stop.is_set():
+            if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+                # Sin eventos: comprobar que la conexión sigue viva
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            else:
+                conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                self._dispatch(notify.channel, notify.payload)
+
+    def _dispatch(self, channel: str, raw: str):
+        try:
+            payload = json.loads(raw) if raw else {}
+        except ValueError:
+            logger.warning("Notificación inválida en %s: %s", channel, raw)
+            return
+        for handler in self.handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("Error procesando evento de %s", channel)
+
+
+event_bus = EventBus()
@@ -0,0 +1,10 @@
+class CheckInRejected(Exception):
+    """Check-in rechazado por reglas de negocio.
+
+    reason: member_not_found | member_inactive | no_active_subscription | already_checked_in
+    """
+
+    def __init__(self, reason: str, open_check_in_time=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.open_check_in_time = open_check_in_time
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from database import Base
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String(50), primary_key=True)
+    last_run_at = Column(TIMESTAMP(timezone=True))
+    last_duration_ms = Column(Integer)
+    last_rows_affected = Column(Integer)
+    last_error = Column(Text)
+    run_count = Column(Integer, nullable=False, default=0)
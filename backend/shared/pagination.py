@@ -0,0 +1,60 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Callable, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value, row_id: int) -> str:
+    """Cursor opaco con la llave (valor de orden, id) de la última fila de la página"""
+    raw = json.dumps([sort_value.isoformat() if sort_value is not None else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, parse: Callable[[str], object]) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return parse(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def keyset_page(
+    query,
+    sort_column,
+    id_column,
+    cursor: Optional[str],
+    limit: int,
+    skip: int = 0,
+    parse: Callable[[str], object] = datetime.fromisoformat
+):
+    """
+    Ordenar descendente por (sort_column, id_column) y, con cursor, continuar
+    después de la última fila entregada. Usa los índices compuestos
+    (sort_column, id), así que cualquier página cuesta lo mismo que la primera.
+    Sin cursor se pagina con skip como antes.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, parse)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+    query = query.order_by(sort_column.desc(), id_column.desc())
+    if not cursor and skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def next_cursor(rows: Sequence, limit: int, sort_attr: str) -> Optional[str]:
+    """Cursor de la siguiente página, o None si ésta fue la última"""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(getattr(last, sort_attr), last.id)
+
+
+def parse_date(value: str) -> date:
+    return date.fromisoformat(value)
@@ -0,0 +1,148 @@
+import logging
+import os
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Tablas particionadas por mes -> columna de partición
+PARTITIONED_TABLES = {
+    "attendance": "date",
+    "payment_records": "payment_date",
+}
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# Filas con fecha futura (p. ej. pagos de una renovación adelantada) caen en la
+# partición default; se crean sus meses hasta este límite
+PARTITION_MAX_MONTHS_AHEAD = int(os.getenv("PARTITION_MAX_MONTHS_AHEAD", "24"))
+# Meses que se conservan adjuntos; 0 = nunca desprender particiones
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))
+# Tablas a las que aplica la retención. attendance no: sus meses viejos se
+# retiran con attendance.archive, que los sigue dejando visibles al leer
+RETENTION_TABLES = ("payment_records",)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def default_partition_range(db: Session, table: str) -> tuple:
+    """(filas, fecha máxima) en la partición default de table"""
+    key = PARTITIONED_TABLES[table]
+    return db.execute(text(f'SELECT count(*), max({key}) FROM "{table}_default"')).one()
+
+
+def ensure_table_partitions(
+    db: Session,
+    table: str,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    today: Optional[date] = None
+) -> int:
+    """Crear las particiones de table del mes actual y los siguientes, y las de
+    los meses futuros que ya tienen filas en la default. No hace commit."""
+    current = (today or date.today()).replace(day=1)
+    last = add_months(current, months_ahead)
+    _, max_key = default_partition_range(db, table)
+    if max_key is not None and max_key >= last:
+        last = min(max_key.replace(day=1), add_months(current, PARTITION_MAX_MONTHS_AHEAD))
+    created = 0
+    month = current
+    while month <= last:
+        # create_monthly_partition mueve las filas que la default ya tenga de ese mes
+        if db.execute(
+            text("SELECT create_monthly_partition(:parent, :month)"),
+            {"parent": table, "month": month}
+        ).scalar():
+            created += 1
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD, today: Optional[date] = None) -> int:
+    """Crear las particiones de todas las tablas. Regresa cuántas se crearon"""
+    return sum(ensure_table_partitions(db, table, months_ahead, today) for table in PARTITIONED_TABLES)
+
+
+def attached_partitions(db: Session, table: str) -> List[tuple]:
+    """Particiones mensuales adjuntas: [(nombre, primer día del mes)]"""
+    names = db.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:parent AS regclass)
+    """), {"parent": table}).scalars().all()
+    pattern = re.compile(rf"^{table}_(\d{{4}})_(\d{{2}})$")
+    partitions = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def detach_table_partitions(
+    db: Session,
+    table: str,
+    retention_months: int = PARTITION_RETENTION_MONTHS,
+    today: Optional[date] = None
+) -> List[str]:
+    """Desprender las particiones de table anteriores a la retención.
+
+    La tabla desprendida se conserva con su nombre para archivarla o borrarla.
+    """
+    if retention_months <= 0:
+        return []
+    cutoff = add_months((today or date.today()).replace(day=1), -retention_months)
+    detached = []
+    for name, month in attached_partitions(db, table):
+        if month < cutoff:
+            db.execute(text(f'ALTER TABLE {table} DETACH PARTITION "{name}"'))
+            detached.append(name)
+            logger.info("Partición %s desprendida de %s", name, table)
+    return detached
+
+
+def detach_old_partitions(db: Session, retention_months: int = PARTITION_RETENTION_MONTHS, today: Optional[date] = None) -> List[str]:
+    detached = []
+    for table in RETENTION_TABLES:
+        detached.extend(detach_table_partitions(db, table, retention_months, today))
+    return detached
+
+
+def partition_maintenance_job(db: Session) -> int:
+    """Tarea del scheduler: crear particiones futuras y desprender las viejas.
+
+    Cada tabla va en su propia transacción, para que un error en una no deje
+    a la otra sin particiones. Si alguna falló se lanza al final, y el
+    scheduler lo registra en scheduled_jobs.
+    """
+    changed = 0
+    failed = []
+    for table in PARTITIONED_TABLES:
+        table_db = SessionLocal()
+        try:
+            changed += ensure_table_partitions(table_db, table)
+            if table in RETENTION_TABLES:
+                changed += len(detach_table_partitions(table_db, table))
+            rows, max_key = default_partition_range(table_db, table)
+            if rows:
+                logger.warning(
+                    "La partición %s_default tiene %s filas (hasta %s) fuera de las particiones mensuales",
+                    table, rows, max_key
+                )
+            table_db.commit()
+        except Exception:
+            table_db.rollback()
+            logger.exception("Error en el mantenimiento de particiones de %s", table)
+            failed.append(table)
+        finally:
+            table_db.close()
+    if failed:
+        raise RuntimeError(f"Mantenimiento de particiones falló en: {', '.join(failed)}")
+    return changed
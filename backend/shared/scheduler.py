@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from shared.models import ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Tarea periódica: func(db) -> filas afectadas"""
+
+    def __init__(self, name: str, func: Callable[[Session], int], interval_seconds: int):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        # Clave estable entre procesos (hash() de Python cambia por proceso)
+        self.lock_key = zlib.crc32(name.encode("utf-8"))
+        self.next_run = 0.0
+
+
+class JobScheduler:
+    """
+    Ejecutor de tareas periódicas dentro del proceso.
+
+    Cada worker de uvicorn arranca su propio scheduler; un advisory lock de
+    Postgres por tarea garantiza que sólo uno la ejecute a la vez, y la tabla
+    scheduled_jobs evita que otro worker la repita antes de su intervalo.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0):
+        self.tick_seconds = tick_seconds
+        self.jobs: Dict[str, Job] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(self, name: str, func: Callable[[Session], int], interval_seconds: int):
+        self.jobs[name] = Job(name, func, interval_seconds)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for job in list(self.jobs.values()):
+                if now >= job.next_run:
+                    self.run_job(job.name)
+                    job.next_run = time.monotonic() + job.interval_seconds
+            self._stop.wait(self.tick_seconds)
+
+    def run_job(self, name: str, force: bool = False) -> Optional[int]:
+        """Ejecutar una tarea. Regresa las filas afectadas, o None si otro worker la tiene"""
+        job = self.jobs[name]
+        db = SessionLocal()
+        try:
+            acquired = db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": job.lock_key}
+            ).scalar()
+            if not acquired:
+                db.rollback()
+                return None
+
+            if not force:
+                recent = db.execute(
+                    text(
+                        "SELECT 1 FROM scheduled_jobs WHERE name = :name "
+                        "AND last_run_at > now() - make_interval(secs => :secs)"
+                    ),
+                    {"name": name, "secs": job.interval_seconds * 0.9},
+                ).first()
+                if recent:
+                    db.rollback()
+                    return None
+
+            started = time.perf_counter()
+            rows = job.func(db) or 0
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            _record_run(db, name, duration_ms, rows, None)
+            db.commit()
+            return rows
+        except Exception as e:
+            db.rollback()
+            logger.exception("Error ejecutando tarea %s", name)
+            try:
+                _record_run(db, name, None, None, str(e))
+                db.commit()
+            except Exception:
+                db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def status(self, db: Session) -> List[dict]:
+        rows = {j.name: j for j in db.query(ScheduledJob).all()}
+        result = []
+        for name, job in self.jobs.items():
+            row = rows.get(name)
+            result.append({
+                "name": name,
+                "interval_seconds": job.interval_seconds,
+                "last_run_at": row.last_run_at.isoformat() if row and row.last_run_at else None,
+                "last_duration_ms": row.last_duration_ms if row else None,
+                "last_rows_affected": row.last_rows_affected if row else None,
+                "last_error": row.last_error if row else None,
+                "run_count": row.run_count if row else 0,
+            })
+        return result
+
+
+def _record_run(db: Session, name: str, duration_ms: Optional[int], rows: Optional[int], error: Optional[str]):
+    if error is None:
+        db.execute(
+            text("""
+                INSERT INTO scheduled_jobs (name, last_run_at, last_duration_ms, last_rows_affected, last_error, run_count)
+                VALUES (:name, now(), :duration_ms, :rows, NULL, 1)
+                ON CONFLICT (name) DO UPDATE SET
+                    last_run_at = now(),
+                    last_duration_ms = EXCLUDED.last_duration_ms,
+                    last_rows_affected = EXCLUDED.last_rows_affected,
+                    last_error = NULL,
+                    run_count = scheduled_jobs.run_count + 1
+            """),
+            {"name": name, "duration_ms": duration_ms, "rows": rows},
+        )
+    else:
+        db.execute(
+            text("""
+                INSERT INTO scheduled_jobs (name, last_error, run_count)
+                VALUES (:name, :error, 0)
+                ON CONFLICT (name) DO UPDATE SET last_error = EXCLUDED.last_error
+            """),
+            {"name": name, "error": error},
+        )
+
+
+scheduler = JobScheduler()
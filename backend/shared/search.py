@@ -0,0 +1,19 @@
+from sqlalchemy import func
+
+# Búsqueda por trigramas (pg_trgm + unaccent). Las expresiones coinciden con
+# los índices GIN ix_members_search_trgm e ix_plans_name_trgm.
+
+
+def fold(value):
+    """Minúsculas y sin acentos, igual que las expresiones indexadas"""
+    return func.lower(func.immutable_unaccent(value))
+
+
+def contains(expression, term: str):
+    """expression contiene term (LIKE '%term%' que usa el índice de trigramas)"""
+    return expression.like(func.concat("%", fold(term), "%"))
+
+
+def rank(expression, term: str):
+    """Similitud de trigramas, para ordenar los resultados"""
+    return func.similarity(expression, fold(term))
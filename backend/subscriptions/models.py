@@ -1,10 +1,29 @@
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, Text, ForeignKey, TIMESTAMP
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, Text, ForeignKey, TIMESTAMP, Index, Computed, and_, case, cast, text
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 
+MX = ZoneInfo("America/Mexico_City")
+
+# Fecha de hoy en México, evaluada por Postgres
+today_mx = cast(func.timezone("America/Mexico_City", func.now()), Date)
+
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Paginación por cursor (created_at, id)
+        Index("ix_subscriptions_created_at_id", "created_at", "id"),
+        # Cuentas por cobrar (activas con saldo)
+        Index(
+            "ix_subscriptions_receivable", "end_date", "id",
+            postgresql_include=["balance_due"],
+            postgresql_where=text("status = 'active' AND balance_due > 0")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     member_id = Column(Integer, ForeignKey("members.id", ondelete="CASCADE"), nullable=False)
@@ -15,12 +34,28 @@ class Subscription(Base):
     status = Column(String(20), nullable=False, default="active")
     payment_status = Column(String(20), nullable=False, default="pending")
     amount_paid = Column(DECIMAL(10, 2), default=0.00)
+    # Lo calcula Postgres; siempre coincide con plan_price y amount_paid
+    balance_due = Column(DECIMAL(10, 2), Computed("plan_price - COALESCE(amount_paid, 0)", persisted=True))
     notes = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     
+    @hybrid_property
+    def effective_status(self):
+        """Estado considerando el vencimiento aunque el barrido aún no lo haya guardado"""
+        if self.status == "active" and self.end_date < datetime.now(MX).date():
+            return "expired"
+        return self.status
+
+    @effective_status.expression
+    def effective_status(cls):
+        return case(
+            (and_(cls.status == "active", cls.end_date < today_mx), "expired"),
+            else_=cls.status
+        )
+
     # Relationships
-    member = relationship("Member", back_populates="subscriptions")
+    member = relationship("Member", back_populates="subscriptions", foreign_keys=[member_id])
     plan = relationship("Plan", back_populates="subscriptions")
     payments = relationship("PaymentRecord", back_populates="subscription")
     attendances = relationship("Attendance", back_populates="subscription")
\ No newline at end of file
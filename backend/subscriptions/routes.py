@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, select, func, cast, Float
 from typing import List, Optional
 from datetime import date, timedelta, datetime
 from pydantic import BaseModel
@@ -9,9 +9,15 @@ from zoneinfo import ZoneInfo
 
 from database import get_db
 from subscriptions.models import Subscription
-from members.models import Member
-from plans.models import Plan
+from members.models import Member, member_search_text
+from plans.models import Plan, plan_search_text
+from plans.service import plan_catalog
 from payments.models import PaymentRecord
+from attendance.eligibility import invalidate_eligibility
+from dashboard.cache import invalidate_dashboard
+from payments.service import post_payment
+from shared.pagination import keyset_page, next_cursor
+from shared.search import contains, rank
 from subscriptions.schemas import SubscriptionCreate, SubscriptionUpdate, SubscriptionResponse
 from users.auth import get_current_active_user, require_admin
 from users.models import User
@@ -53,17 +59,13 @@ def calculate_end_date(start_date: date, duration_days: int) -> date:
             return start_date
         return start_date + timedelta(days=duration_days)
 
-def update_subscription_status(subscription: Subscription):
-    if subscription.end_date < get_today() and subscription.status == "active":
-        subscription.status = "expired"
-
 @router.post("/", response_model=SubscriptionResponse, status_code=status.HTTP_201_CREATED)
 def create_subscription(subscription: SubscriptionCreate, db: Session = Depends(get_db)):
     member = db.query(Member).filter(Member.id == subscription.member_id).first()
     if not member:
         raise HTTPException(status_code=404, detail="Miembro no encontrado")
     
-    plan = db.query(Plan).filter(Plan.id == subscription.plan_id).first()
+    plan = plan_catalog.get(db, subscription.plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
     
@@ -86,13 +88,15 @@ def create_subscription(subscription: SubscriptionCreate, db: Session = Depends(
     else:
         end_date = calculate_end_date(subscription.start_date, plan.duration_days)
     
-    subscription_data = subscription.model_dump(exclude={'payment_method'})
+    subscription_data = subscription.model_dump(exclude={'payment_method', 'amount_paid', 'payment_status'})
     
     db_subscription = Subscription(
         **subscription_data,
         plan_price=plan.price,
         end_date=end_date,
-        status="active"
+        status="active",
+        payment_status="pending",
+        amount_paid=Decimal("0.00")
     )
     
     db.add(db_subscription)
@@ -116,16 +120,10 @@ def create_subscription(subscription: SubscriptionCreate, db: Session = Depends(
             notes=subscription.notes or f"Pago al crear suscripción {plan.name}"
         )
         db.add(db_payment)
-
-    db_subscription.amount_paid = subscription.amount_paid
-
-    if subscription.amount_paid <= 0:
-        db_subscription.payment_status = "pending"
-    elif float(subscription.amount_paid) < float(plan.price):
-        db_subscription.payment_status = "partial"
-    else:
-        db_subscription.payment_status = "paid"
+        post_payment(db, db_subscription.id, db_payment.amount)
     
+    invalidate_eligibility(db, subscription.member_id)
+    invalidate_dashboard(db, "subscriptions", "payments")
     db.commit()
     db.refresh(db_subscription)
     return db_subscription
@@ -143,7 +141,7 @@ def renew_subscription(
         raise HTTPException(status_code=404, detail="Suscripción no encontrada")
     
     plan_id = renew_data.plan_id if renew_data.plan_id else old_subscription.plan_id
-    plan = db.query(Plan).filter(Plan.id == plan_id).first()
+    plan = plan_catalog.get(db, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
     
@@ -180,7 +178,7 @@ def renew_subscription(
         end_date=new_end_date,
         status="active",
         payment_status="pending",
-        amount_paid=0.0,
+        amount_paid=Decimal("0.00"),
         notes=renew_data.notes
     )
     
@@ -188,15 +186,6 @@ def renew_subscription(
     db.add(new_subscription)
     db.flush()
 
-    new_subscription.amount_paid = renew_data.amount_paid or 0.0
-
-    if (renew_data.amount_paid or 0) <= 0:
-        new_subscription.payment_status = "pending"
-    elif float(renew_data.amount_paid) < float(plan.price):
-        new_subscription.payment_status = "partial"
-    else:
-        new_subscription.payment_status = "paid"
-
     if (renew_data.amount_paid or 0) > 0:
         db_payment = PaymentRecord(
             subscription_id=new_subscription.id,
@@ -207,7 +196,10 @@ def renew_subscription(
             notes=f"Pago al renovar suscripción {plan.name}"
         )
         db.add(db_payment)
+        post_payment(db, new_subscription.id, db_payment.amount)
     
+    invalidate_eligibility(db, old_subscription.member_id)
+    invalidate_dashboard(db, "subscriptions", "payments")
     db.commit()
     db.refresh(new_subscription)
     return new_subscription
@@ -225,17 +217,7 @@ def register_payment(
     if not subscription:
         raise HTTPException(status_code=404, detail="Suscripción no encontrada")
 
-    plan = db.query(Plan).filter(Plan.id == subscription.plan_id).first()
-
-    new_amount_paid = float(subscription.amount_paid or 0) + payment_data.amount
-    subscription.amount_paid = new_amount_paid
-
-    if new_amount_paid <= 0:
-        subscription.payment_status = "pending"
-    elif new_amount_paid < float(plan.price):
-        subscription.payment_status = "partial"
-    else:
-        subscription.payment_status = "paid"
+    plan = plan_catalog.get(db, subscription.plan_id)
 
     db_payment = PaymentRecord(
         subscription_id=subscription.id,
@@ -246,6 +228,10 @@ def register_payment(
         notes=payment_data.notes or f"Abono a suscripción {plan.name}"
     )
     db.add(db_payment)
+    # UPDATE atómico: dos abonos simultáneos no se pierden
+    post_payment(db, subscription.id, db_payment.amount)
+    invalidate_eligibility(db, subscription.member_id)
+    invalidate_dashboard(db, "subscriptions", "payments")
     db.commit()
     db.refresh(subscription)
     return subscription
@@ -259,68 +245,83 @@ def get_subscriptions(
     search: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (en lugar de skip)"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Subscription).options(
-        joinedload(Subscription.member),
-        joinedload(Subscription.plan)
-    )
+    """
+    Listar suscripciones en una sola consulta: la página ya con la forma de
+    salida y el total con count(*) OVER (). Con cursor el total no se calcula
+    (ya se obtuvo en la primera página) para no recorrer todas las filas.
+    """
+    query = select(
+        Subscription.id,
+        Subscription.member_id,
+        Subscription.plan_id,
+        cast(Subscription.plan_price, Float).label("plan_price"),
+        Subscription.start_date,
+        Subscription.end_date,
+        Subscription.effective_status.label("status"),
+        Subscription.payment_status,
+        cast(func.coalesce(Subscription.amount_paid, 0), Float).label("amount_paid"),
+        Subscription.notes,
+        Subscription.created_at,
+        func.json_build_object(
+            "id", Member.id,
+            "first_name", Member.first_name,
+            "last_name_paternal", Member.last_name_paternal,
+            "last_name_maternal", Member.last_name_maternal
+        ).label("member"),
+        func.json_build_object(
+            "id", Plan.id,
+            "name", Plan.name,
+            "price", Plan.price,
+            "duration_days", Plan.duration_days,
+            "description", Plan.description
+        ).label("plan")
+    ).join(Member, Subscription.member_id == Member.id).join(Plan, Subscription.plan_id == Plan.id)
     
     if status:
-        query = query.filter(Subscription.status == status)
+        query = query.where(Subscription.effective_status == status)
     if member_id:
-        query = query.filter(Subscription.member_id == member_id)
+        query = query.where(Subscription.member_id == member_id)
     if search:
-        search_pattern = f"%{search}%"
-        query = query.join(Member).join(Plan).filter(
-            (Member.first_name.ilike(search_pattern)) |
-            (Member.last_name_paternal.ilike(search_pattern)) |
-            (Plan.name.ilike(search_pattern))
-        )
+        # Cada subconsulta usa su índice de trigramas
+        query = query.where(
+            Subscription.member_id.in_(select(Member.id).where(contains(member_search_text, search))) |
+            Subscription.plan_id.in_(select(Plan.id).where(contains(plan_search_text, search)))
+        ).order_by(func.greatest(rank(member_search_text, search), rank(plan_search_text, search)).desc())
+        cursor = None
     if payment_status:
-        query = query.filter(Subscription.payment_status == payment_status)
+        query = query.where(Subscription.payment_status == payment_status)
     
-    total = query.count()
-    subscriptions = query.order_by(Subscription.created_at.desc()).offset(skip).limit(limit).all()
+    # La ventana se calcula sobre todas las filas filtradas antes del LIMIT
+    page_query = query if cursor else query.add_columns(func.count().over().label("total"))
+    rows = db.execute(
+        keyset_page(page_query, Subscription.created_at, Subscription.id, cursor, limit, skip=skip)
+    ).all()
     
-    for sub in subscriptions:
-        update_subscription_status(sub)
-    db.commit()
+    if cursor:
+        total = None
+    elif rows:
+        total = rows[0].total
+    elif skip:
+        # Página fuera de rango: el total no viene en ninguna fila
+        total = db.execute(select(func.count()).select_from(query.subquery())).scalar()
+    else:
+        total = 0
     
     subscriptions_data = []
-    for sub in subscriptions:
-        subscriptions_data.append({
-            "id": sub.id,
-            "member_id": sub.member_id,
-            "plan_id": sub.plan_id,
-            "plan_price": float(sub.plan_price),
-            "start_date": sub.start_date.isoformat(),
-            "end_date": sub.end_date.isoformat(),
-            "status": sub.status,
-            "payment_status": sub.payment_status,
-            "amount_paid": float(sub.amount_paid) if sub.amount_paid else 0.0,
-            "notes": sub.notes,
-            "created_at": sub.created_at.isoformat(),
-            "member": {
-                "id": sub.member.id,
-                "first_name": sub.member.first_name,
-                "last_name_paternal": sub.member.last_name_paternal,
-                "last_name_maternal": sub.member.last_name_maternal
-            } if sub.member else None,
-            "plan": {
-                "id": sub.plan.id,
-                "name": sub.plan.name,
-                "price": float(sub.plan.price),
-                "duration_days": sub.plan.duration_days,
-                "description": sub.plan.description
-            } if sub.plan else None
-        })
+    for row in rows:
+        data = row._asdict()
+        data.pop("total", None)
+        subscriptions_data.append(data)
     
     return {
         "subscriptions": subscriptions_data,
         "total": total,
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": None if search else next_cursor(rows, limit, "created_at")
     }
 
 
@@ -333,8 +334,6 @@ def get_subscription(
     subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
     if not subscription:
         raise HTTPException(status_code=404, detail="Suscripción no encontrada")
-    update_subscription_status(subscription)
-    db.commit()
     return subscription
 
 
@@ -353,6 +352,8 @@ def update_subscription(
     for field, value in update_data.items():
         setattr(db_subscription, field, value)
     
+    invalidate_eligibility(db, db_subscription.member_id)
+    invalidate_dashboard(db, "subscriptions", "payments")
     db.commit()
     db.refresh(db_subscription)
     return db_subscription
@@ -368,6 +369,8 @@ def delete_subscription(
     if not db_subscription:
         raise HTTPException(status_code=404, detail="Suscripción no encontrada")
     db.delete(db_subscription)
+    invalidate_eligibility(db, db_subscription.member_id)
+    invalidate_dashboard(db, "subscriptions", "payments")
     db.commit()
     return None
 
@@ -390,8 +393,4 @@ def get_member_active_subscription(
         )
     ).first()
     
-    if subscription:
-        update_subscription_status(subscription)
-        db.commit()
-    
     return subscription
\ No newline at end of file
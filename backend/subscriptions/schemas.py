@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import AliasChoices, BaseModel, Field, field_validator
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional
@@ -47,7 +47,8 @@ class SubscriptionResponse(SubscriptionBase):
     id: int
     plan_price: Decimal
     end_date: date
-    status: str
+    # Estado efectivo (vencidas como "expired" aunque el barrido no haya corrido)
+    status: str = Field(validation_alias=AliasChoices("effective_status", "status"))
     created_at: datetime
     plan: PlanBase
     member: MemberBase
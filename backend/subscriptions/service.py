@@ -0,0 +1,28 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from subscriptions.models import Subscription, today_mx
+from dashboard.cache import invalidate_dashboard
+
+
+def expire_subscriptions(db: Session) -> int:
+    """Marcar como expiradas, en un solo UPDATE, las suscripciones activas vencidas.
+
+    Las lecturas ya usan Subscription.effective_status; esto sólo persiste el
+    cambio. No hace commit.
+    """
+    result = db.execute(
+        update(Subscription)
+        .where(Subscription.status == "active", Subscription.end_date < today_mx)
+        .values(status="expired")
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def expire_subscriptions_job(db: Session) -> int:
+    """Tarea del scheduler"""
+    expired = expire_subscriptions(db)
+    if expired:
+        invalidate_dashboard(db, "subscriptions")
+    return expired